@@ -0,0 +1,63 @@
+"""
+benchmark prefix list aggregation
+
+usage: python benchmarks/aggregate.py [max_prefixes]
+
+aggregates doubling numbers of random /24s (with adjacent pairs, so there
+is work to do) and prints the time per prefix, which should stay flat as
+the list grows.
+"""
+
+import random
+import sys
+import time
+
+from bgpfu.prefixlist import SimplePrefixList
+from bgpfu.prefixlist.simple import aggregate_pairs
+
+
+def make_pairs(count, seed=0):
+    rnd = random.Random(seed)
+    pairs = []
+    while len(pairs) < count:
+        net = rnd.getrandbits(23) << 9
+        pairs.append((net, 24))
+        pairs.append((net | 0x100, 24))
+    return pairs[:count]
+
+
+def run(func, *args):
+    start = time.perf_counter()
+    res = func(*args)
+    return time.perf_counter() - start, res
+
+
+def main(max_count=2 ** 21):
+    print(f"{'prefixes':>10} {'aggregates':>10} {'seconds':>9} {'ns/prefix':>10}")
+
+    count = 2 ** 14
+    while count <= max_count:
+        pairs = make_pairs(count)
+        elapsed, res = run(aggregate_pairs, pairs, 32)
+        print(
+            f"{count:>10} {len(res):>10} {elapsed:>9.3f} {elapsed / count * 1e9:>10.0f}"
+        )
+        count *= 2
+
+    print()
+    print("SimplePrefixList.aggregate")
+    count = 2 ** 14
+    while count <= max_count // 8:
+        prefixes = SimplePrefixList(
+            "%d.%d.%d.0/24" % (net >> 24, net >> 16 & 0xFF, net >> 8 & 0xFF)
+            for net, _ in make_pairs(count)
+        )
+        elapsed, res = run(prefixes.aggregate)
+        print(
+            f"{count:>10} {len(res):>10} {elapsed:>9.3f} {elapsed / count * 1e9:>10.0f}"
+        )
+        count *= 2
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
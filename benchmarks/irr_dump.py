@@ -0,0 +1,92 @@
+"""
+benchmark loading an RPSL dump into DumpIRR and answering queries from it,
+and the same for an index built with build_index
+
+usage: python benchmarks/irr_dump.py [routes] [lookups]
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bgpfu.irr import DumpIRR, IndexIRR
+from bgpfu.irr.index import build_index
+
+
+def make_dump(count, seed=0):
+    """count routes, about 10 per origin, and 100 as-sets"""
+    rnd = random.Random(seed)
+    origins = max(1, count // 10)
+    out = io.StringIO()
+    for i in range(count):
+        net = rnd.getrandbits(24)
+        out.write(
+            "route:          %d.%d.%d.0/24\n"
+            "descr:          benchmark\n"
+            "origin:         AS%d\n"
+            "mnt-by:         MAINT-BENCH\n"
+            "source:         BENCH\n\n"
+            % (net >> 16, net >> 8 & 0xFF, net & 0xFF, 64512 + i % origins)
+        )
+    for i in range(100):
+        members = ", ".join("AS%d" % (64512 + j) for j in range(i * 10, i * 10 + 10))
+        out.write(f"as-set:         AS-BENCH{i}\nmembers:        {members}\n")
+        out.write("source:         BENCH\n\n")
+    out.seek(0)
+    return out
+
+
+def main(count=1000000, lookups=1000000):
+    dump = make_dump(count)
+
+    irr = DumpIRR()
+    start = time.perf_counter()
+    irr.load_lines(dump)
+    elapsed = time.perf_counter() - start
+    print(f"load {count} routes: {elapsed:.3f}s, {count / elapsed:.0f} objects/s")
+
+    origins = ["AS%d" % (64512 + i % max(1, count // 10)) for i in range(lookups)]
+    start = time.perf_counter()
+    for origin in origins:
+        irr._routes(origin, 4)
+    elapsed = time.perf_counter() - start
+    print(f"{lookups} route lookups: {elapsed:.3f}s, {lookups / elapsed:.0f}/s")
+
+    start = time.perf_counter()
+    for i in range(100):
+        irr.get_prefixes(f"AS-BENCH{i}")
+    elapsed = time.perf_counter() - start
+    print(f"100 as-set prefix lists: {elapsed:.3f}s")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        dump_path = os.path.join(tmpdir, "bench.db")
+        index_path = os.path.join(tmpdir, "bench.idx")
+        with open(dump_path, "w") as fobj:
+            fobj.write(dump.getvalue())
+
+        start = time.perf_counter()
+        build_index([dump_path], index_path)
+        elapsed = time.perf_counter() - start
+        print(f"build index: {elapsed:.3f}s, {os.path.getsize(index_path)} bytes")
+
+        start = time.perf_counter()
+        with IndexIRR(index_path) as irr:
+            irr.get_prefixes("AS-BENCH0")
+        elapsed = time.perf_counter() - start
+        print(f"open index and get 1 as-set prefix list: {elapsed * 1000:.2f}ms")
+
+        with IndexIRR(index_path) as irr:
+            start = time.perf_counter()
+            for origin in origins:
+                irr._routes(origin, 4)
+            elapsed = time.perf_counter() - start
+        print(
+            f"{lookups} index route lookups: {elapsed:.3f}s, {lookups / elapsed:.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
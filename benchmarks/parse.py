@@ -0,0 +1,58 @@
+"""
+benchmark prefix parsing against ipaddress.ip_network
+
+usage: python benchmarks/parse.py [prefixes]
+"""
+
+import ipaddress
+import random
+import sys
+import time
+
+from bgpfu.prefixlist import CompactPrefixList, PrefixSet, SimplePrefixList
+from bgpfu.prefixlist.parse import iter_parse_prefixes
+
+
+def make_payload(count, seed=0):
+    rnd = random.Random(seed)
+    prefixes = []
+    for i in range(count):
+        if i % 5:
+            net = rnd.getrandbits(24)
+            prefixes.append("%d.%d.%d.0/24" % (net >> 16, net >> 8 & 0xFF, net & 0xFF))
+        else:
+            prefixes.append("2001:db8:%x::/48" % rnd.getrandbits(16))
+    return " ".join(prefixes)
+
+
+def ip_network_path(payload):
+    return [ipaddress.ip_network(str(v)) for v in payload.split()]
+
+
+def parse_path(payload):
+    return list(iter_parse_prefixes(payload))
+
+
+def main(count=200000):
+    payload = make_payload(count)
+    tests = [
+        ("ip_network(str(v))", ip_network_path),
+        ("iter_parse_prefixes", parse_path),
+        ("SimplePrefixList.iter_add", lambda p: SimplePrefixList().iter_add(p.split())),
+        (
+            "CompactPrefixList.iter_add",
+            lambda p: CompactPrefixList().iter_add(p.split()),
+        ),
+        ("PrefixSet.iter_add", lambda p: PrefixSet().iter_add(p.split())),
+    ]
+
+    print(f"{'method':>28} {'seconds':>9} {'ns/prefix':>10}")
+    for name, func in tests:
+        start = time.perf_counter()
+        func(payload)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>28} {elapsed:>9.3f} {elapsed / count * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,45 @@
+"""
+compare memory use of SimplePrefixList and CompactPrefixList
+
+usage: python benchmarks/prefixlist_memory.py [prefixes]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from bgpfu.prefixlist import CompactPrefixList, SimplePrefixList
+
+
+def make_prefixes(count, seed=0):
+    rnd = random.Random(seed)
+    prefixes = []
+    for i in range(count):
+        if i % 5:
+            net = rnd.getrandbits(24)
+            prefixes.append("%d.%d.%d.0/24" % (net >> 16, net >> 8 & 0xFF, net & 0xFF))
+        else:
+            prefixes.append("2001:db8:%x::/48" % rnd.getrandbits(16))
+    return prefixes
+
+
+def measure(cls, prefixes):
+    tracemalloc.start()
+    obj = cls(prefixes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def main(count=200000):
+    prefixes = make_prefixes(count)
+    print(f"{'class':>20} {'prefixes':>10} {'MiB':>8} {'bytes/prefix':>13}")
+    for cls in (SimplePrefixList, CompactPrefixList):
+        obj, size = measure(cls, prefixes)
+        print(
+            f"{cls.__name__:>20} {len(obj):>10} {size / 2 ** 20:>8.1f} {size / count:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""
+benchmark aggregated export of PrefixSet.data
+
+usage: python benchmarks/prefixset_data.py [entries]
+
+builds prefix sets from random wide prefix^ge-le ranges, including IPv6
+ranges spanning 2^32 prefixes, and times PrefixSet.data(aggregate=True)
+"""
+
+import random
+import sys
+import time
+
+from bgpfu.prefixlist import PrefixSet
+
+
+def make_data(count, seed=0):
+    rnd = random.Random(seed)
+    data = {"ipv4": [], "ipv6": []}
+    for i in range(count):
+        if i % 2:
+            net = rnd.getrandbits(8) << 8
+            data["ipv4"].append(
+                {
+                    "prefix": "%d.%d.0.0/16" % (net >> 8, net & 0xFF),
+                    "greater-equal": rnd.randint(16, 20),
+                    "less-equal": 24,
+                }
+            )
+        else:
+            data["ipv6"].append(
+                {
+                    "prefix": "2001:%x::/32" % rnd.getrandbits(16),
+                    "greater-equal": rnd.randint(32, 48),
+                    "less-equal": 64,
+                }
+            )
+    return data
+
+
+def main(max_count=4096):
+    print(f"{'entries':>8} {'ranges':>8} {'prefixes':>12} {'output':>8} {'seconds':>9}")
+    count = 16
+    while count <= max_count:
+        ps = PrefixSet(make_data(count))
+        ranges = len(list(ps._iter_ranges()))
+
+        start = time.perf_counter()
+        data = ps.data(aggregate=True)
+        elapsed = time.perf_counter() - start
+
+        output = len(data["ipv4"]) + len(data["ipv6"])
+        print(f"{count:>8} {ranges:>8} {len(ps):>12.3g} {output:>8} {elapsed:>9.3f}")
+        count *= 4
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
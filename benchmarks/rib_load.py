@@ -0,0 +1,79 @@
+"""
+benchmark loading a synthetic RIB file into RoaTree
+
+usage: python benchmarks/rib_load.py [lines]
+"""
+
+import gzip
+import ipaddress
+import os
+import random
+import sys
+import tempfile
+import time
+
+import radix
+
+from bgpfu.roa import RoaTree
+
+
+def write_rib(path, count, seed=0):
+    rnd = random.Random(seed)
+    with open(path, "w") as fobj:
+        fobj.write("# synthetic rib\n")
+        for i in range(count):
+            if i % 8:
+                net = rnd.getrandbits(24)
+                prefix = "%d.%d.%d.0/24" % (net >> 16, net >> 8 & 0xFF, net & 0xFF)
+            else:
+                prefix = "2001:%x:%x::/48" % (rnd.getrandbits(16), rnd.getrandbits(16))
+            asns = "|".join(str(rnd.randint(1, 400000)) for _ in range(1 + i % 3 // 2))
+            fobj.write(f"{prefix} {asns}\n")
+
+
+def _add_node(tree, prefix_str, roa):
+    node = tree.search_exact(prefix_str)
+    if not node:
+        node = tree.add(prefix_str)
+    node.data.setdefault("roas", []).append(roa)
+
+
+def readlines_load(path):
+    """the previous loader, whole file and ipaddress per line"""
+    tree = radix.Radix()
+    with open(path) as fh:
+        for line in fh.readlines():
+            if line[0] == "#":
+                continue
+            prefix_str, asns = line.split()
+            prefix = ipaddress.ip_network(prefix_str)
+            for asn in asns.split("|"):
+                roa = dict(asn=int(asn), prefix=prefix, maxLength=prefix.prefixlen)
+                _add_node(tree, prefix_str, roa)
+    return tree
+
+
+def main(count=1000000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "rib.txt")
+        write_rib(path, count)
+        gz_path = path + ".gz"
+        with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            dst.write(src.read())
+
+        tests = [
+            ("readlines + ip_network", lambda: readlines_load(path)),
+            ("load_rib_file", lambda: RoaTree().load_rib_file(path)),
+            ("load_rib_file gzip", lambda: RoaTree().load_rib_file(gz_path)),
+        ]
+
+        print(f"{'method':>24} {'seconds':>9} {'lines/s':>10}")
+        for name, func in tests:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>24} {elapsed:>9.3f} {count / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""
+benchmark loading a synthetic validator export into RoaTree
+
+usage: python benchmarks/rpki_load.py [vrps]
+"""
+
+import ipaddress
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import radix
+
+from bgpfu.roa import RoaTree
+
+
+def make_vrps(count, seed=0):
+    rnd = random.Random(seed)
+    for i in range(count):
+        if i % 8:
+            net = rnd.getrandbits(24)
+            prefix = "%d.%d.%d.0/24" % (net >> 16, net >> 8 & 0xFF, net & 0xFF)
+            max_length = 24
+        else:
+            prefix = "2001:%x:%x::/48" % (rnd.getrandbits(16), rnd.getrandbits(16))
+            max_length = 48
+        yield f"AS{rnd.randint(1, 400000)}", prefix, max_length
+
+
+def write_json(path, count):
+    with open(path, "w") as fobj:
+        fobj.write('{"metadata": {"vrps": %d}, "roas": [\n' % count)
+        fobj.write(
+            ",\n".join(
+                json.dumps(dict(asn=asn, prefix=prefix, maxLength=max_length, ta="x"))
+                for asn, prefix, max_length in make_vrps(count)
+            )
+        )
+        fobj.write("\n]}\n")
+
+
+def write_csv(path, count):
+    with open(path, "w") as fobj:
+        fobj.write("ASN,IP Prefix,Max Length,Trust Anchor\n")
+        for asn, prefix, max_length in make_vrps(count):
+            fobj.write(f"{asn},{prefix},{max_length},x\n")
+
+
+def _parse_roa(roa):
+    try:
+        roa["prefix"] = ipaddress.ip_network(roa["prefix"])
+        if not isinstance(roa["asn"], int):
+            roa["asn"] = int(roa["asn"].replace("AS", ""))
+        roa["maxLength"] = int(roa["maxLength"])
+        if not 0 <= roa["asn"] < 2 ** 32:
+            raise ValueError(f"asn {roa['asn']} is out of range")
+    except ValueError as exc:
+        logging.warning(str(exc))
+        return None
+    return roa
+
+
+def json_load(path):
+    """the previous loader, json.load and a dict per roa"""
+    with open(path) as fh:
+        data = json.load(fh)
+    tree = radix.Radix()
+    for roa in data["roas"]:
+        prefix_str = roa["prefix"]
+        roa = _parse_roa(roa)
+        node = tree.search_exact(prefix_str)
+        if not node:
+            node = tree.add(prefix_str)
+        node.data.setdefault("roas", []).append(roa)
+    return tree
+
+
+LOADERS = {
+    "json.load": json_load,
+    "load_rpki_file": lambda path: RoaTree().load_rpki_file(path),
+}
+
+
+def run(name, path):
+    """run a loader in this process, print seconds and peak rss"""
+    start = time.perf_counter()
+    LOADERS[name](path)
+    elapsed = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    print(f"{name + ' ' + os.path.basename(path):>30} {elapsed:>9.3f} {rss:>9}")
+
+
+def main(count=500000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "vrps.json")
+        csv_path = os.path.join(tmpdir, "vrps.csv")
+        write_json(json_path, count)
+        write_csv(csv_path, count)
+
+        print(f"{'method':>30} {'seconds':>9} {'peak MiB':>9}", flush=True)
+        # separate processes for peak memory
+        for name, path in (
+            ("json.load", json_path),
+            ("load_rpki_file", json_path),
+            ("load_rpki_file", csv_path),
+        ):
+            subprocess.run([sys.executable, __file__, "--run", name, path], check=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        run(*sys.argv[2:4])
+    else:
+        main(*map(int, sys.argv[1:]))
@@ -0,0 +1,115 @@
+"""
+benchmark route origin validation with RoaTree.validate_many and
+validate_parallel against calling validation_state per route, with and
+without its cache
+
+usage: python benchmarks/validate.py [routes] [vrps]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from bgpfu.prefixlist.parse import parse_prefix
+from bgpfu.roa import RoaTree
+
+
+def make_vrps(count, seed=0):
+    """IPv4 VRPs from /8 to /24, mostly /24, so many of them nest"""
+    rnd = random.Random(seed)
+    for _ in range(count):
+        length = rnd.choice((24,) * 12 + (23, 22, 22, 21, 20, 20, 19, 18, 17, 16, 16))
+        if rnd.random() < 0.01:
+            length = rnd.randint(8, 15)
+        net = rnd.getrandbits(length) << (32 - length)
+        prefix = "%d.%d.%d.%d/%d" % (*net.to_bytes(4, "big"), length)
+        yield f"AS{rnd.randint(1, 400000)}", prefix, rnd.randint(length, 24)
+
+
+def make_routes(count, vrps, seed=0):
+    """most routes at or below a VRP prefix, the rest anywhere"""
+    rnd = random.Random(seed)
+    for _ in range(count):
+        asn, prefix, _ = rnd.choice(vrps)
+        net, length, _ = parse_prefix(prefix)
+        if rnd.random() < 0.3:
+            net, length = rnd.getrandbits(32), 24
+        length = rnd.randint(length, 24)
+        net = net | rnd.getrandbits(32 - length) << 8 >> 8
+        net = net >> (32 - length) << (32 - length)
+        prefix = "%d.%d.%d.%d/%d" % (*net.to_bytes(4, "big"), length)
+        origin = int(asn[2:]) if rnd.random() < 0.8 else rnd.randint(1, 400000)
+        yield prefix, origin
+
+
+def write_csv(path, vrps):
+    with open(path, "w") as fobj:
+        fobj.write("ASN,IP Prefix,Max Length,Trust Anchor\n")
+        for asn, prefix, max_length in vrps:
+            fobj.write(f"{asn},{prefix},{max_length},x\n")
+
+
+def main(count=1000000, vrp_count=500000):
+    vrps = list(make_vrps(vrp_count))
+    routes = list(make_routes(count, vrps))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "vrps.csv")
+        write_csv(path, vrps)
+        tree = RoaTree(rpki_file=path)
+        cached = RoaTree(rpki_file=path, cache_size=100000)
+
+    # build the lookup index, once per load
+    start = time.perf_counter()
+    tree.validation_state(*routes[0])
+    cached.validation_state(*routes[0])
+    print(f"index built in {time.perf_counter() - start:.3f}s")
+
+    print(f"{'method':>30} {'routes':>9} {'seconds':>9} {'routes/s':>10}")
+
+    sample = routes[:100000]
+    start = time.perf_counter()
+    single = [tree.validation_state(*route)["state"] for route in sample]
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'validation_state':>30} {len(sample):>9} {elapsed:>9.3f} "
+        f"{int(len(sample) / elapsed):>10}"
+    )
+
+    # the same 20k routes from 5 peers
+    repeated = routes[:20000] * 5
+    for name, db in (("repeated", tree), ("repeated, cache_size=100000", cached)):
+        start = time.perf_counter()
+        for route in repeated:
+            db.validation_state(*route)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>30} {len(repeated):>9} {elapsed:>9.3f} "
+            f"{int(len(repeated) / elapsed):>10}"
+        )
+
+    start = time.perf_counter()
+    results = list(tree.validate_many(routes))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'validate_many':>30} {count:>9} {elapsed:>9.3f} {int(count / elapsed):>10}"
+    )
+
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        result = tree.validate_parallel(routes, workers=workers)
+        elapsed = time.perf_counter() - start
+        name = f"validate_parallel workers={workers}"
+        print(f"{name:>30} {count:>9} {elapsed:>9.3f} {int(count / elapsed):>10}")
+    assert result["counts"]["invalid"] == len(result["invalid"])
+
+    states = {}
+    for prefix, origin, state in results:
+        states[(prefix, origin)] = state
+    assert single == [states[route] for route in sample]
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,100 @@
+"""
+benchmark covering prefix lookups in VRPStore, through the ancestor index
+against one dict lookup per prefix length in use
+
+usage: python benchmarks/vrp_lookup.py [vrps] [lookups]
+"""
+
+import random
+import sys
+import time
+from bisect import bisect_right
+
+from bgpfu.prefixlist.parse import MAX_PREFIXLEN
+from bgpfu.vrp import VRPStore
+
+
+def probe_covering(store, net, length, version):
+    """the previous lookup, one dict lookup per length"""
+    max_len = MAX_PREFIXLEN[version]
+    vrps = store._vrps[version]
+    lengths = store._lengths[version]
+    for cover_len in lengths[: bisect_right(lengths, length)]:
+        shift = max_len - cover_len
+        value = vrps.get((1 << cover_len) + (net >> shift))
+        if value is not None:
+            yield net >> shift << shift, cover_len, store._unpack(value)
+
+
+def make_store(count, version, seed=0):
+    """
+    VRPs over all lengths from /8 (/19) to /24 (/48), many under a few
+    large covering prefixes
+    """
+    rnd = random.Random(seed)
+    max_len = MAX_PREFIXLEN[version]
+    low, high = (8, 24) if version == 4 else (19, 48)
+    top = rnd.getrandbits(low) << (max_len - low)
+    store = VRPStore()
+    for i in range(count):
+        length = rnd.randint(low, high)
+        net = rnd.getrandbits(length) << (max_len - length)
+        if i % 2:
+            # under the large covering prefix
+            net = top | net >> low
+            net = net >> (max_len - length) << (max_len - length)
+        if not store.get(net, length, version):
+            store.add(net, length, version, [(rnd.randint(1, 400000), high)])
+    if not store.get(top, low, version):
+        store.add(top, low, version, [(1, high)])
+    return store, top, low
+
+
+def make_queries(count, store, version, top, low, seed=1):
+    rnd = random.Random(seed)
+    max_len = MAX_PREFIXLEN[version]
+    length = 24 if version == 4 else 48
+    queries = []
+    for i in range(count):
+        net = rnd.getrandbits(length) << (max_len - length)
+        if i % 2:
+            net = top | net >> low
+            net = net >> (max_len - length) << (max_len - length)
+        queries.append((net, length, version))
+    return queries
+
+
+def timed(lookup, queries):
+    start = time.perf_counter()
+    for query in queries:
+        for _ in lookup(*query):
+            pass
+    return time.perf_counter() - start
+
+
+def main(count=200000, lookups=200000):
+    print(f"{'data':>8} {'method':>16} {'seconds':>9} {'lookups/s':>10}")
+    for version in (4, 6):
+        store, top, low = make_store(count, version)
+        queries = make_queries(lookups, store, version, top, low)
+        name = f"IPv{version}"
+
+        for query in queries[:1000]:
+            expected = list(probe_covering(store, *query))
+            assert expected == list(store.iter_covering(*query))
+            assert (expected[-1] if expected else None) == store.best_covering(*query)
+
+        methods = {
+            "per length": lambda *query: probe_covering(store, *query),
+            "iter_covering": store.iter_covering,
+            "best_covering": lambda *query: (store.best_covering(*query),),
+        }
+        for method, lookup in methods.items():
+            elapsed = timed(lookup, queries)
+            print(
+                f"{name:>8} {method:>16} {elapsed:>9.3f} {int(lookups / elapsed):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
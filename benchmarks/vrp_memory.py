@@ -0,0 +1,101 @@
+"""
+benchmark memory and lookup time of VRP storage
+
+compares py-radix with a roa dict per VRP (the original RoaTree), py-radix
+with (asn, maxLength) tuples, and VRPStore
+
+usage: python benchmarks/vrp_memory.py [vrps]
+"""
+
+import ipaddress
+import os
+import subprocess
+import sys
+import time
+
+import radix
+
+sys.path.insert(0, os.path.dirname(__file__))
+from rpki_load import make_vrps  # noqa: E402
+
+from bgpfu.prefixlist.parse import parse_prefix  # noqa: E402
+from bgpfu.vrp import VRPStore  # noqa: E402
+
+
+def rss_kib():
+    with open("/proc/self/statm") as fobj:
+        return int(fobj.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def radix_dicts(vrps):
+    tree = radix.Radix()
+    for asn, prefix, max_length in vrps:
+        node = tree.search_exact(prefix) or tree.add(prefix)
+        roa = dict(
+            asn=int(asn[2:]), prefix=ipaddress.ip_network(prefix), maxLength=max_length
+        )
+        node.data.setdefault("roas", []).append(roa)
+    return tree, lambda prefix: tree.search_covering(prefix)
+
+
+def radix_tuples(vrps):
+    tree = radix.Radix()
+    for asn, prefix, max_length in vrps:
+        node = tree.search_exact(prefix) or tree.add(prefix)
+        node.data.setdefault("roas", []).append((int(asn[2:]), max_length))
+    return tree, lambda prefix: tree.search_covering(prefix)
+
+
+def vrp_store(vrps):
+    store = VRPStore()
+    for asn, prefix, max_length in vrps:
+        store.add(*parse_prefix(prefix), [(int(asn[2:]), max_length)])
+    return store, lambda prefix: list(store.iter_covering(*parse_prefix(prefix)))
+
+
+STORES = {
+    "radix + roa dicts": radix_dicts,
+    "radix + tuples": radix_tuples,
+    "VRPStore": vrp_store,
+}
+
+
+def run(name, count):
+    vrps = list(make_vrps(count))
+    queries = [prefix for _, prefix, _ in vrps[:100000]]
+    base = rss_kib()
+    start = time.perf_counter()
+    store, lookup = STORES[name](vrps)
+    elapsed = time.perf_counter() - start
+    # both families, so any index is built before timing
+    lookup(queries[0])
+    lookup(queries[1])
+
+    start = time.perf_counter()
+    for prefix in queries:
+        lookup(prefix)
+    lookups = (time.perf_counter() - start) / len(queries)
+    # after lookups, which build any index on demand
+    used = rss_kib() - base
+    print(
+        f"{name:>18} {elapsed:>9.3f} {used // 1024:>9} "
+        f"{used * 1024 // count:>9} {lookups * 1e6:>11.2f}"
+    )
+
+
+def main(count=500000):
+    print(
+        f"{'store':>18} {'build s':>9} {'MiB':>9} {'bytes/vrp':>9} {'lookup us':>11}",
+        flush=True,
+    )
+    for name in STORES:
+        subprocess.run(
+            [sys.executable, __file__, "--run", name, str(count)], check=True
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        run(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(*map(int, sys.argv[1:]))
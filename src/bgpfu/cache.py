@@ -0,0 +1,247 @@
+"""
+caches for query results
+"""
+
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+
+class DiskCache:
+    """
+    persistent key value cache stored in sqlite
+
+    values are anything json serializable. entries expire ttl seconds after
+    they're set, and once there are more than max_entries the least
+    recently used are evicted.
+    """
+
+    # keys per SELECT in get_many, older sqlite allows 999 parameters
+    CHUNK = 500
+
+    def __init__(self, path, ttl=86400, max_entries=100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = dict(hits=0, misses=0)
+
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.db = sqlite3.connect(path)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT, expires REAL, used REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (used)")
+        self._count = self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    def get(self, key, default=None):
+        """get value for key, default if it's missing or expired"""
+        row = self.db.execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or row[1] <= now:
+            if row is not None:
+                self.delete(key)
+            self.stats["misses"] += 1
+            return default
+
+        with self.db:
+            self.db.execute("UPDATE cache SET used = ? WHERE key = ?", (now, key))
+        self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def get_many(self, keys, default=None):
+        """
+        get a list of values for keys, default for those missing or expired
+
+        reads with a SELECT per chunk of keys and marks hits used in a single
+        transaction, rather than one per key as get does
+        """
+        keys = list(keys)
+        now = time.time()
+        rows = {}
+        for start in range(0, len(keys), self.CHUNK):
+            chunk = list(set(keys[start : start + self.CHUNK]) - rows.keys())
+            if not chunk:
+                continue
+            rows.update(
+                (row[0], row[1:])
+                for row in self.db.execute(
+                    "SELECT key, value, expires FROM cache WHERE key IN ({})".format(
+                        ",".join("?" * len(chunk))
+                    ),
+                    chunk,
+                )
+            )
+
+        values = []
+        used = set()
+        expired = set()
+        for key in keys:
+            row = rows.get(key)
+            if row is None or row[1] <= now:
+                if row is not None:
+                    expired.add(key)
+                self.stats["misses"] += 1
+                values.append(default)
+                continue
+            used.add(key)
+            self.stats["hits"] += 1
+            values.append(json.loads(row[0]))
+
+        if used or expired:
+            with self.db:
+                self.db.executemany(
+                    "UPDATE cache SET used = ? WHERE key = ?",
+                    ((now, key) for key in used),
+                )
+                cur = self.db.executemany(
+                    "DELETE FROM cache WHERE key = ?", ((key,) for key in expired)
+                )
+            if expired:
+                self._count -= cur.rowcount
+        return values
+
+    def set(self, key, value, ttl=None):
+        """set value for key, expiring after ttl seconds (default self.ttl)"""
+        if ttl is None:
+            ttl = self.ttl
+        now = time.time()
+        row = (json.dumps(value), now + ttl, now, key)
+
+        with self.db:
+            cur = self.db.execute(
+                "UPDATE cache SET value = ?, expires = ?, used = ? WHERE key = ?", row
+            )
+            if not cur.rowcount:
+                self.db.execute(
+                    "INSERT INTO cache (value, expires, used, key) VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                self._count += 1
+
+        if self._count > self.max_entries:
+            self.evict(self._count - self.max_entries)
+
+    def delete(self, key):
+        with self.db:
+            cur = self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._count -= cur.rowcount
+
+    def evict(self, count):
+        """remove the count least recently used entries"""
+        with self.db:
+            cur = self.db.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY used LIMIT ?)",
+                (count,),
+            )
+        self._count -= cur.rowcount
+
+    def purge(self):
+        """remove all expired entries"""
+        with self.db:
+            cur = self.db.execute(
+                "DELETE FROM cache WHERE expires <= ?", (time.time(),)
+            )
+        self._count -= cur.rowcount
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM cache")
+        self._count = 0
+
+
+class MemoryCache:
+    """
+    in process LRU cache
+
+    same interface as DiskCache, values are stored as is so callers must not
+    modify them. entries expire ttl seconds after they're set, and once
+    there are more than max_entries the least recently used are evicted.
+    """
+
+    def __init__(self, ttl=300, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = dict(hits=0, misses=0)
+
+        # key: (expires, value), least recently used first
+        self._data = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._data)
+
+    def close(self):
+        pass
+
+    def get(self, key, default=None):
+        """get value for key, default if it's missing or expired"""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.stats["misses"] += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def get_many(self, keys, default=None):
+        """get a list of values for keys, default for those missing or expired"""
+        return [self.get(key, default) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        """set value for key, expiring after ttl seconds (default self.ttl)"""
+        if ttl is None:
+            ttl = self.ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+
+        if len(self._data) > self.max_entries:
+            self.evict(len(self._data) - self.max_entries)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def evict(self, count):
+        """remove the count least recently used entries"""
+        for _ in range(min(count, len(self._data))):
+            self._data.popitem(last=False)
+
+    def purge(self):
+        """remove all expired entries"""
+        now = time.monotonic()
+        for key in [key for key, entry in self._data.items() if entry[0] <= now]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
@@ -17,10 +17,13 @@
 
 import ipaddress
 import logging
+import os
 
 import click
 
-import bgpfu.client
+from bgpfu.cache import DiskCache
+from bgpfu.irr import CachedIRR, DumpIRR, IndexIRR, IRRPool, RoutePlanner
+from bgpfu.irr.index import build_index
 from bgpfu.output import Output
 from bgpfu.prefixlist import SimplePrefixList as PrefixList
 from bgpfu.prefixlist.set import PrefixSet
@@ -36,6 +39,81 @@ def common_options(f):
     return f
 
 
+def connect_options(f):
+    f = click.option(
+        "--host",
+        "hosts",
+        help="IRR host[:port] to query, may be given multiple times for failover",
+        type=str,
+        multiple=True,
+        default=("rr.ntt.net",),
+        show_default=True,
+    )(f)
+    f = click.option(
+        "--pool-size",
+        help="number of IRR connections to keep open",
+        default=1,
+        show_default=True,
+    )(f)
+    return f
+
+
+def get_pool(kwargs):
+    """get an IRR connection pool for the connect options"""
+    return IRRPool(kwargs["hosts"], size=kwargs["pool_size"])
+
+
+def cache_options(f):
+    f = click.option(
+        "--cache-dir",
+        help="cache IRR query results in this directory",
+        type=click.Path(file_okay=False),
+        default=None,
+    )(f)
+    f = click.option(
+        "--cache-ttl",
+        help="seconds to keep cached IRR query results",
+        default=86400,
+        show_default=True,
+    )(f)
+    return f
+
+
+def dump_options(f):
+    f = click.option(
+        "--dump",
+        "dumps",
+        help="answer queries from this RPSL dump instead of an IRR server, may be given multiple times",
+        type=click.Path(exists=True, dir_okay=False),
+        multiple=True,
+    )(f)
+    f = click.option(
+        "--index",
+        help="answer queries from this index instead of an IRR server, see index build",
+        type=click.Path(exists=True, dir_okay=False),
+        default=None,
+    )(f)
+    return f
+
+
+def get_offline_irr(kwargs):
+    """get the IRR backend for the dump options, None if not using one"""
+    if kwargs.get("index"):
+        return IndexIRR(kwargs["index"])
+    if kwargs.get("dumps"):
+        return DumpIRR(kwargs["dumps"])
+    return None
+
+
+def get_cache(kwargs):
+    """get an IRR query result cache for the cache options, None if disabled"""
+    if not kwargs.get("cache_dir"):
+        return None
+    return DiskCache(
+        os.path.join(kwargs["cache_dir"], "irr.sqlite"), ttl=kwargs["cache_ttl"]
+    )
+
+
 def as_set_options(f):
     f = click.option(
         "--skip-as",
@@ -93,9 +171,38 @@ def check_roa(ctx, prefix, asn, rib_file, rpki_file, **kwargs):
     print(rv)
 
 
+@cli.command()
+@common_options
+@click.option("--rpki-file", help="use rpki json or csv file", required=True)
+@click.option(
+    "--workers",
+    help="number of processes to validate with",
+    default=1,
+    show_default=True,
+)
+@click.option("--show-invalid", help="list invalid routes", is_flag=True)
+@click.argument("rib-files", nargs=-1, required=True, type=click.Path(exists=True))
+def check_rib(rpki_file, workers, show_invalid, rib_files, **kwargs):
+    """check routes in rib files against rpki"""
+    if kwargs.get("debug", False):
+        logging.basicConfig(level=logging.DEBUG)
+
+    db = RoaTree(rpki_file=rpki_file)
+    for rib_file in rib_files:
+        result = db.validate_parallel(rib_file, workers=workers)
+        print(
+            "{} valid {valid} invalid {invalid} notfound {notfound}".format(
+                rib_file, **result["counts"]
+            )
+        )
+        if show_invalid:
+            for prefix, origin in result["invalid"]:
+                print(f"  {prefix} {origin}")
+
+
 @cli.command()
 @click.pass_context
-# @connect_options
+@connect_options
 @common_options
 @click.argument("query", nargs=1)
 def raw(ctx, query, **kwargs):
@@ -103,13 +210,15 @@ def raw(ctx, query, **kwargs):
     if kwargs.get("debug", False):
         logging.basicConfig(level=logging.DEBUG)
 
-    bgpfuc = bgpfu.client.IRRClient()
-    with bgpfuc as c:
+    with get_pool(kwargs) as pool, pool.connection() as c:
         data = c.query(query)
         print(data)
 
 
 @cli.command()
+@connect_options
+@cache_options
+@dump_options
 @common_options
 @as_set_options
 @click.argument("as-set", nargs=-1)
@@ -118,15 +227,27 @@ def as_set(ctx, as_set, **kwargs):
     """expand an as-set"""
     if kwargs.get("debug", False):
         logging.basicConfig(level=logging.DEBUG)
-    bgpfuc = bgpfu.client.IRRClient()
-    with bgpfuc as c:
-        sets = c.get_sets(as_set)
+    offline = get_offline_irr(kwargs)
+    if offline is not None:
+        with offline:
+            sets = offline.get_sets(as_set)
+    else:
+        cache = get_cache(kwargs)
+        with get_pool(kwargs) as pool:
+            if cache is not None:
+                with cache:
+                    sets = CachedIRR(pool, cache).get_sets(as_set)
+            else:
+                with pool.connection() as c:
+                    sets = c.get_sets(as_set)
 
     print("\n".join(sets))
 
 
 @cli.command()
-# @connect_options
+@connect_options
+@cache_options
+@dump_options
 @common_options
 @output_options
 @click.option(
@@ -151,14 +272,35 @@ def prefixlist(ctx, as_set, output, output_format, proto, **kwargs):
         prefixes = PrefixSet(aggregate=kwargs["aggregate"])
     else:
         prefixes = PrefixList()
-    bgpfuc = bgpfu.client.IRRClient()
-    with bgpfuc as c:
+    offline = get_offline_irr(kwargs)
+    cache = get_cache(kwargs) if offline is None else None
+    with get_pool(kwargs) as pool:
+        if offline is not None:
+            irr = offline
+        elif cache is not None:
+            irr = CachedIRR(pool, cache)
+        else:
+            irr = pool
         if kwargs.get("sources", False):
-            c.set_sources(kwargs["sources"])
-        #        prefixes = c.get_prefixes(as_set, proto)
-
-        for chunk in c.iter_prefixes(as_set, proto):
-            prefixes.iter_add(chunk)
+            irr.set_sources(kwargs["sources"])
+
+        if offline is not None:
+            with offline:
+                for chunk in irr.iter_prefixes(as_set, proto):
+                    prefixes.iter_add(chunk)
+        elif cache is not None:
+            with cache:
+                for chunk in irr.iter_prefixes(as_set, proto):
+                    prefixes.iter_add(chunk)
+        else:
+            planner = RoutePlanner(pool)
+            for chunk in planner.iter_prefixes(as_set, proto):
+                prefixes.iter_add(chunk)
+            logging.getLogger(__name__).info(
+                "route queries: {queries}, saved: {queries_saved}".format(
+                    **planner.stats
+                )
+            )
 
         if not kwargs["fancy"] and kwargs["aggregate"]:
             prefixes = prefixes.aggregate()
@@ -167,3 +309,22 @@ def prefixlist(ctx, as_set, output, output_format, proto, **kwargs):
             outfmt.write(output_format, fobj, prefixes.str_list())
 
         print(f"LEN {len(prefixes)}")
+
+
+@cli.group()
+def index():
+    """offline IRR index"""
+
+
+@index.command("build")
+@common_options
+@click.option("--output", "-o", help="index file to write", required=True)
+@click.option("--sources", help="use only specified sources (default is all)")
+@click.argument("dumps", nargs=-1, required=True, type=click.Path(exists=True))
+def index_build(output, sources, dumps, **kwargs):
+    """build an index from RPSL dump files"""
+    if kwargs.get("debug", False):
+        logging.basicConfig(level=logging.DEBUG)
+
+    stats = build_index(dumps, output, sources=sources.split(",") if sources else None)
+    print("indexed {routes} routes and {sets} sets".format(**stats))
@@ -1,3 +1,17 @@
+import bz2
+import gzip
+
 # import to namespace
 from gevent import select, socket  # noqa
 from gevent.queue import Empty, Full, Queue  # noqa
+
+
+def open_compressed(path):
+    """open a plain, gzipped or bzip2ed file as text"""
+    with open(path, "rb") as fobj:
+        magic = fobj.read(3)
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if magic == b"BZh":
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
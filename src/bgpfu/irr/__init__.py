@@ -1,3 +1,11 @@
 # import to namespace
-from .base import IRRBase  # noqa
+from .aio import AsyncIRRClient  # noqa
+from .base import IRRBase, OfflineIRRBase  # noqa
+from .cache import CachedIRR  # noqa
+from .dump import DumpIRR  # noqa
+from .expand import SetExpander  # noqa
+from .index import IndexIRR  # noqa
 from .native import IRRClient  # noqa
+from .nrtm import NRTMClient  # noqa
+from .planner import RoutePlanner  # noqa
+from .pool import IRRPool  # noqa
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+
+from pkg_resources import get_distribution
+
+from bgpfu.irr import protocol
+from bgpfu.irr.base import IRRBase
+
+
+class AsyncIRRClient(IRRBase):
+    """
+    asyncio IRR client, pipelines queries from any number of tasks over a
+    single keepalive connection
+
+    the IRRBase methods are coroutines, iter_ methods are async generators
+    """
+
+    def __init__(self, host="rr.ntt.net", port=43):
+        self.keepalive = True
+        self.host = host
+        self.port = port
+
+        self.log = logging.getLogger(__name__)
+
+        self.reader = None
+        self.writer = None
+        # futures for sent queries, in the order responses will arrive
+        self._pending = None
+        self._read_task = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, typ, value, traceback):
+        await self.close()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self._pending = asyncio.Queue()
+        self._read_task = asyncio.ensure_future(self._process_responses())
+
+        if self.keepalive:
+            self.writer.write(b"!!\n")
+
+        await self.query_one("!nBGPFU-{}".format(get_distribution("bgpfu").version))
+
+    async def close(self):
+        if self._read_task:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    async def _read_response(self):
+        """
+        read the next response, returns the result data or None if there is
+        none
+        """
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+
+        sz = protocol.parse_response(line.decode("ascii").rstrip())
+        if not sz:
+            return None
+
+        data = await self.reader.readexactly(sz)
+        line = await self.reader.readline()
+        if line.rstrip() != b"C":
+            raise RuntimeError(f"expected end of response, got '{line}'")
+        return data.decode("utf-8")
+
+    async def _process_responses(self):
+        """match responses to queued futures until the connection fails"""
+        fut = None
+        try:
+            while True:
+                fut = await self._pending.get()
+                try:
+                    res = await self._read_response()
+                except (KeyError, RuntimeError) as exc:
+                    # error for this query only
+                    if not fut.done():
+                        fut.set_exception(exc)
+                    continue
+                if not fut.done():
+                    fut.set_result(res)
+
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            # connection is gone, fail everything outstanding
+            self.log.error("connection failed: %s", exc)
+            if fut and not fut.done():
+                fut.set_exception(ConnectionError(str(exc)))
+            while not self._pending.empty():
+                fut = self._pending.get_nowait()
+                if not fut.done():
+                    fut.set_exception(ConnectionError(str(exc)))
+
+    def _send(self, querylist):
+        """
+        queue and write queries, returns futures for their responses
+
+        enqueuing and writing happen without yielding to the loop so that
+        concurrent callers can't interleave
+        """
+        if not self.writer:
+            raise OSError("not connected")
+
+        loop = asyncio.get_event_loop()
+        futures = []
+        for query in querylist:
+            fut = loop.create_future()
+            self._pending.put_nowait(fut)
+            futures.append(fut)
+
+        self.log.debug(f"QUERY {querylist}")
+        self.writer.write(("\n".join(querylist) + "\n").encode("ascii"))
+        return futures
+
+    async def iter_query(self, querylist):
+        """
+        performs a pipelined query, yields results as they arrive
+        """
+        if isinstance(querylist, str):
+            querylist = (querylist,)
+        if not querylist:
+            return
+
+        futures = self._send(querylist)
+        await self.writer.drain()
+        for fut in futures:
+            res = await fut
+            if res:
+                yield res
+
+    async def query_one(self, query):
+        """
+        performs a query, checks for at most 1 result, returns it
+        """
+        res = await self.query((query,))
+
+        if len(res) > 1:
+            raise ValueError(f"query_one returned {len(res)} results")
+
+        elif len(res) == 1:
+            return res[0]
+
+        return None
+
+    async def query(self, querylist):
+        """
+        performs a query, returns a list
+        """
+        return [res async for res in self.iter_query(querylist)]
+
+    async def set_sources(self, *sources):
+        """set sources to the specified list"""
+        await self.query("!s{}".format(",".join(sources)))
+
+    async def iter_sets(self, objs, expand=True):
+        """
+        Return members of an as-set or route-set.
+        if expand is true, also recursively expand members of all sets within the named set.
+        """
+        if isinstance(objs, str):
+            objs = (objs,)
+
+        seen = set()
+        querylist = [protocol.make_set_query(obj, expand) for obj in objs]
+        async for res in self.iter_query(querylist):
+            for member in res.split():
+                if member not in seen:
+                    seen.add(member)
+                    yield member
+
+    async def get_sets(self, objs, expand=True):
+        return [member async for member in self.iter_sets(objs, expand)]
+
+    async def iter_routes(self, obj, proto=4):
+        """get routes for specified object"""
+        async for res in self.iter_query(protocol.make_route_query(obj, proto)):
+            yield res.split()
+
+    async def get_routes(self, obj, proto=4):
+        return [routes async for routes in self.iter_routes(obj, proto)]
+
+    async def iter_prefixes(self, as_sets, proto=4):
+        """get prefix list for specified as-set(s)"""
+        members = await self.get_sets(as_sets)
+        querylist = [protocol.make_route_query(asn, proto) for asn in members]
+        async for res in self.iter_query(querylist):
+            yield res.split()
+
+    async def get_prefixes(self, as_sets, proto=4):
+        return [prefixes async for prefixes in self.iter_prefixes(as_sets, proto)]
@@ -1,5 +1,7 @@
 import inspect
 
+from bgpfu.irr.expand import SetExpander
+
 
 class IRRBase:
     """
@@ -65,3 +67,63 @@ class IRRBase:
         get prefix list for specified as-set(s)
         """
         return list(self.iter_prefixes(as_sets, proto))
+
+
+class OfflineIRRBase(IRRBase):
+    """
+    Base class for backends answering queries from local data
+
+    subclasses provide get_members() and _routes(origin, proto), sets are
+    expanded with SetExpander.
+    """
+
+    def get_members(self, objs):
+        """
+        get direct members of sets, returns a list with a member list per
+        set, None for sets that don't exist
+        """
+        raise NotImplementedError(
+            "{} does not implement {}".format(
+                self.__class__.__name__, inspect.currentframe().f_code.co_name
+            )
+        )
+
+    def _routes(self, origin, proto):
+        """returns a list of the prefixes of origin"""
+        raise NotImplementedError(
+            "{} does not implement {}".format(
+                self.__class__.__name__, inspect.currentframe().f_code.co_name
+            )
+        )
+
+    def iter_sets(self, objs, expand=True):
+        """
+        Return members of an as-set or route-set.
+        if expand is true, also recursively expand members of all sets within the named set.
+        """
+        if isinstance(objs, str):
+            objs = (objs,)
+
+        if expand:
+            yield from SetExpander(self.get_members).expand(objs)
+            return
+
+        seen = set()
+        for members in self.get_members(objs):
+            for member in members or ():
+                if member not in seen:
+                    seen.add(member)
+                    yield member
+
+    def iter_routes(self, obj, proto=4):
+        """get routes for specified object"""
+        prefixes = self._routes(obj, proto)
+        if prefixes:
+            yield prefixes
+
+    def iter_prefixes(self, as_sets, proto=4):
+        """get prefix list for specified as-set(s)"""
+        for member in self.iter_sets(as_sets):
+            prefixes = self._routes(member, proto)
+            if prefixes:
+                yield prefixes
@@ -0,0 +1,104 @@
+import logging
+from contextlib import contextmanager
+
+from bgpfu.irr import protocol
+from bgpfu.irr.base import IRRBase
+from bgpfu.irr.pool import IRRPool
+
+
+class CachedIRR(IRRBase):
+    """
+    caches IRR query results in front of an IRRClient or IRRPool
+
+    results are cached per query and source list, any cache with get(key)
+    and set(key, value) methods can be used, and get_many(keys) if it has
+    one. queries that miss the cache
+    are pipelined together, and with a pool no connection is made at all
+    if everything is cached.
+
+    with DiskCache("irr.sqlite") as cache:
+        irr = CachedIRR(pool, cache)
+        irr.get_prefixes("AS-20C")
+    """
+
+    def __init__(self, irr, cache):
+        self.irr = irr
+        self.cache = cache
+        self.sources = ()
+
+        self.log = logging.getLogger(__name__)
+
+    @contextmanager
+    def _client(self):
+        if isinstance(self.irr, IRRPool):
+            with self.irr.connection() as client:
+                yield client
+        else:
+            yield self.irr
+
+    def set_sources(self, *sources):
+        """set sources to the specified list"""
+        self.sources = sources
+        self.irr.set_sources(*sources)
+
+    def _key(self, query):
+        return "{}|{}".format(",".join(self.sources), query)
+
+    def query(self, querylist):
+        """
+        performs a query, returns a list with the tokens of each result, an
+        empty list for queries without one
+        """
+        keys = [self._key(query) for query in querylist]
+        get_many = getattr(self.cache, "get_many", None)
+        if get_many is not None:
+            results = get_many(keys)
+        else:
+            results = [self.cache.get(key) for key in keys]
+        misses = [
+            (idx, query)
+            for idx, (query, res) in enumerate(zip(querylist, results))
+            if res is None
+        ]
+
+        if misses:
+            self.log.debug(f"{len(misses)} of {len(querylist)} queries not cached")
+            with self._client() as client:
+                responses = client.iter_responses([query for _, query in misses])
+                for (idx, query), res in zip(misses, responses):
+                    res = res.split() if res else []
+                    self.cache.set(self._key(query), res)
+                    results[idx] = res
+
+        return results
+
+    def iter_sets(self, objs, expand=True):
+        """
+        Return members of an as-set or route-set.
+        if expand is true, also recursively expand members of all sets within the named set.
+        """
+        if isinstance(objs, str):
+            objs = (objs,)
+
+        seen = set()
+        querylist = [protocol.make_set_query(obj, expand) for obj in objs]
+        for res in self.query(querylist):
+            for member in res:
+                if member not in seen:
+                    seen.add(member)
+                    yield member
+
+    def iter_routes(self, obj, proto=4):
+        """get routes for specified object"""
+        res = self.query([protocol.make_route_query(obj, proto)])[0]
+        if res:
+            yield res
+
+    def iter_prefixes(self, as_sets, proto=4):
+        """get prefix list for specified as-set(s)"""
+        querylist = [
+            protocol.make_route_query(asn, proto) for asn in self.iter_sets(as_sets)
+        ]
+        for res in self.query(querylist):
+            if res:
+                yield res
@@ -0,0 +1,209 @@
+import logging
+import time
+
+from bgpfu.io import open_compressed
+from bgpfu.irr.base import OfflineIRRBase
+
+# object classes indexed, and the attributes kept for each
+CLASSES = {
+    "route": ("route", "origin", "source"),
+    "route6": ("route6", "origin", "source"),
+    "as-set": ("as-set", "members", "source"),
+    "route-set": ("route-set", "members", "mp-members", "source"),
+}
+
+
+def iter_rpsl(lines, classes=CLASSES):
+    """
+    parse RPSL objects from lines, yields (class, attributes) for objects of
+    the classes given, attributes is a dict of attribute name to list of
+    values, only attributes listed in classes are kept
+    """
+    keep = None
+    attrs = None
+    obj_class = None
+    key = None
+
+    for line in lines:
+        first = line[:1]
+        if first in ("", "\n", "\r"):
+            # blank line ends the object
+            if keep:
+                yield obj_class, attrs
+            keep = attrs = key = None
+            continue
+        if first in ("#", "%"):
+            continue
+
+        if first in (" ", "\t", "+"):
+            # continuation of the last attribute
+            if keep and key in keep:
+                value = line[1:].partition("#")[0].strip()
+                if value:
+                    attrs[key].append(value)
+            continue
+
+        key, _, value = line.partition(":")
+        key = key.strip().lower()
+        if attrs is None:
+            # first attribute names the class
+            if key not in classes:
+                keep = ()
+                attrs = {}
+                continue
+            obj_class = key
+            keep = classes[key]
+            attrs = {name: [] for name in keep}
+
+        if keep and key in keep:
+            value = value.partition("#")[0].strip()
+            if value:
+                attrs[key].append(value)
+
+    if keep:
+        yield obj_class, attrs
+
+
+class DumpIRR(OfflineIRRBase):
+    """
+    IRR backend answering queries from RPSL database dumps
+
+    dumps, plain or compressed, are parsed in a single streaming pass and
+    route, route6, as-set and route-set objects are indexed in memory per
+    source. sets are expanded with SetExpander.
+
+    irr = DumpIRR(["radb.db.gz", "ripe.db.route.gz"])
+    irr.get_prefixes("AS-20C")
+    """
+
+    def __init__(self, paths=(), sources=None):
+        self.log = logging.getLogger(__name__)
+
+        # source: {4: {origin: {prefix: None}}, 6: {...}}
+        self.routes = {}
+        # source: {set name: members}
+        self.sets = {}
+        if isinstance(sources, str):
+            sources = (sources,)
+        self.set_sources(*(sources or ()))
+        self.stats = dict(objects=0, routes=0, sets=0)
+
+        if isinstance(paths, str):
+            paths = (paths,)
+        for path in paths:
+            self.load(path)
+
+    def load(self, path):
+        """load objects from the dump at path"""
+        start = time.time()
+        count = self.stats["objects"]
+        with open_compressed(path) as fobj:
+            self.load_lines(fobj)
+        count = self.stats["objects"] - count
+        self.log.info(
+            f"loaded {count} objects from {path} in {time.time() - start:.2f}s"
+        )
+
+    def load_lines(self, lines):
+        """load objects from an iterable of RPSL lines"""
+        for obj_class, attrs in iter_rpsl(lines):
+            self.add_object(obj_class, attrs)
+
+    @staticmethod
+    def _source(attrs):
+        return attrs["source"][0].upper() if attrs["source"] else ""
+
+    def add_object(self, obj_class, attrs):
+        """add or replace an object, as parsed by iter_rpsl"""
+        source = self._source(attrs)
+        self.stats["objects"] += 1
+
+        if obj_class in ("route", "route6"):
+            if not attrs[obj_class] or not attrs["origin"]:
+                return
+            proto = 6 if obj_class == "route6" else 4
+            origins = self.routes.setdefault(source, {4: {}, 6: {}})[proto]
+            origin = attrs["origin"][0].upper()
+            origins.setdefault(origin, {})[attrs[obj_class][0]] = None
+            self.stats["routes"] += 1
+
+        else:
+            members = []
+            for value in attrs["members"] + attrs.get("mp-members", []):
+                for member in value.split(","):
+                    member = member.strip()
+                    # names are case insensitive, prefixes kept as is
+                    if "/" not in member:
+                        member = member.upper()
+                    if member:
+                        members.append(member)
+            name = attrs[obj_class][0].upper()
+            self.sets.setdefault(source, {})[name] = members
+            self.stats["sets"] += 1
+
+    def delete_object(self, obj_class, attrs):
+        """
+        delete an object, as parsed by iter_rpsl, returns False if it
+        wasn't found
+        """
+        source = self._source(attrs)
+
+        if obj_class in ("route", "route6"):
+            if not attrs[obj_class] or not attrs["origin"]:
+                return False
+            proto = 6 if obj_class == "route6" else 4
+            origins = self.routes.get(source, {}).get(proto, {})
+            origin = attrs["origin"][0].upper()
+            prefixes = origins.get(origin, {})
+            if attrs[obj_class][0] not in prefixes:
+                return False
+            del prefixes[attrs[obj_class][0]]
+            if not prefixes:
+                del origins[origin]
+            return True
+
+        name = attrs[obj_class][0].upper() if attrs[obj_class] else None
+        return self.sets.get(source, {}).pop(name, None) is not None
+
+    def set_sources(self, *sources):
+        """set sources to the specified list, in order of preference"""
+        self.sources = [
+            name.strip().upper() for source in sources for name in source.split(",")
+        ] or None
+
+    def _sources(self, index):
+        if self.sources is None:
+            return list(index.values())
+        return [index[source] for source in self.sources if source in index]
+
+    def get_members(self, objs):
+        """
+        get direct members of sets, returns a list with a member list per
+        set, None for sets that don't exist
+        """
+        sets = self._sources(self.sets)
+        result = []
+        for obj in objs:
+            obj = obj.upper()
+            for source in sets:
+                if obj in source:
+                    result.append(source[obj])
+                    break
+            else:
+                result.append(None)
+        return result
+
+    def _routes(self, origin, proto):
+        proto = int(proto)
+        if proto not in (4, 6):
+            raise ValueError("unknown protocol '%s'" % str(proto))
+
+        origin = origin.upper()
+        sources = self._sources(self.routes)
+        if len(sources) == 1:
+            return list(sources[0][proto].get(origin, ()))
+
+        prefixes = {}
+        for source in sources:
+            prefixes.update(source[proto].get(origin, ()))
+        return list(prefixes)
@@ -0,0 +1,114 @@
+import logging
+import re
+
+re_asn = re.compile(r"^AS\d+$", re.IGNORECASE)
+
+
+def is_set_name(name):
+    """check if an as-set or route-set member is a set rather than an ASN or prefix"""
+    return not (re_asn.match(name) or "/" in name)
+
+
+class SetExpander:
+    """
+    client side recursive as-set and route-set expansion
+
+    walks sets breadth first, fetching each level of sub-sets in a single
+    call to fetch, which takes a list of set names and returns a list of
+    their direct members, in the same order, None for sets that don't
+    exist. every set is fetched once, so sub-sets shared between sets
+    or between calls are reused and loops terminate.
+
+    raises ValueError if sets nest deeper than max_depth, or expand to more
+    than max_size members
+
+    stats counts sets fetched, fetch calls, missing sets and loops found
+    """
+
+    def __init__(self, fetch, max_depth=16, max_size=None):
+        self.fetch = fetch
+        self.max_depth = max_depth
+        self.max_size = max_size
+        self.log = logging.getLogger(__name__)
+
+        # set name: direct members, None if it doesn't exist
+        self.members = {}
+        self.stats = dict(sets=0, fetches=0, missing=0, loops=0)
+
+    def _fetch_all(self, names):
+        """fetch names and all sets below them that aren't known yet"""
+        level = [name for name in dict.fromkeys(names) if name not in self.members]
+        depth = 0
+        while level:
+            depth += 1
+            if depth > self.max_depth:
+                raise ValueError(
+                    f"set expansion exceeds max depth {self.max_depth} at {level[0]}"
+                )
+
+            results = self.fetch(level)
+            self.stats["fetches"] += 1
+            self.stats["sets"] += len(level)
+
+            for name, members in zip(level, results):
+                if members is None:
+                    self.log.warning(f"set {name} not found")
+                    self.stats["missing"] += 1
+                self.members[name] = members
+
+            # only after the whole level is known, so sets in it aren't
+            # fetched again
+            nxt = {}
+            for name in level:
+                for member in self.members[name] or ():
+                    if is_set_name(member) and member not in self.members:
+                        nxt[member] = None
+            level = list(nxt)
+
+    def _walk(self, name, seen, result):
+        """
+        collect members of name and its sub-sets into result, depth first
+
+        uses an explicit stack, since sub-sets linked to each other can
+        chain far deeper than max_depth levels of fetching
+        """
+        # sets on the current path, to tell loops from shared sub-sets
+        path = {name}
+        stack = [(name, iter(self.members[name] or ()))]
+        while stack:
+            parent, members = stack[-1]
+            for member in members:
+                if not is_set_name(member):
+                    if member not in result:
+                        result[member] = None
+                        if self.max_size and len(result) > self.max_size:
+                            raise ValueError(
+                                f"set expansion exceeds max size {self.max_size}"
+                            )
+                elif member in path:
+                    self.log.warning(f"set loop {parent} -> {member}")
+                    self.stats["loops"] += 1
+                elif member not in seen:
+                    seen.add(member)
+                    path.add(member)
+                    stack.append((member, iter(self.members[member] or ())))
+                    break
+            else:
+                stack.pop()
+                path.remove(parent)
+
+    def expand(self, names):
+        """
+        recursively expand sets, returns a list of their unique members
+        """
+        if isinstance(names, str):
+            names = (names,)
+        self._fetch_all(names)
+
+        result = {}
+        seen = set()
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                self._walk(name, seen, result)
+        return list(result)
@@ -0,0 +1,230 @@
+"""
+compiled binary index of IRR data, read through mmap
+
+layout, all integers little endian:
+
+    header      magic, version, then (offset, count) of the route4, route6
+                and set directories
+    route dirs  sorted array of asn u32, followed by an (offset u64,
+                count u32) record per asn pointing to count sorted (address,
+                length) prefix records, 4 + 1 bytes for IPv4 and 16 + 1
+                bytes for IPv6
+    set dir     (name offset u64, name length u32, members offset u64,
+                members length u32) records sorted by name, members are
+                stored as newline separated ASCII
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from socket import AF_INET6, inet_ntop
+
+from bgpfu.irr.base import OfflineIRRBase
+from bgpfu.irr.dump import DumpIRR
+from bgpfu.irr.expand import re_asn
+from bgpfu.prefixlist.parse import parse_prefix
+
+MAGIC = b"BGPFUIDX"
+VERSION = 1
+
+HEADER = struct.Struct("<8sI" + "QQ" * 3)
+ROUTE_DIR = struct.Struct("<QI")
+SET_DIR = struct.Struct("<QIQI")
+PREFIX_SIZE = {4: 5, 6: 17}
+V4_PREFIX = struct.Struct("5B")
+
+
+def _write_routes(fobj, irr, proto):
+    """write prefix records and return the directory for proto"""
+    origins = {}
+    for source in irr._sources(irr.routes):
+        for origin in source[proto]:
+            if not re_asn.match(origin):
+                continue
+            asn = int(origin[2:])
+            if asn >= 1 << 32:
+                irr.log.warning(f"skipping routes of invalid origin {origin}")
+                continue
+            origins[asn] = origin
+
+    size = PREFIX_SIZE[proto] - 1
+    directory = []
+    for asn in sorted(origins):
+        records = set()
+        for prefix in irr._routes(origins[asn], proto):
+            try:
+                net, length, version = parse_prefix(prefix)
+            except ValueError:
+                irr.log.warning(f"skipping invalid prefix {prefix} of AS{asn}")
+                continue
+            if version == proto:
+                records.add(net.to_bytes(size, "big") + bytes((length,)))
+        if not records:
+            continue
+
+        directory.append((asn, (fobj.tell(), len(records))))
+        fobj.write(b"".join(sorted(records)))
+    return directory
+
+
+def _write_sets(fobj, irr):
+    """write set names and members and return the directory"""
+    names = {}
+    for source in irr._sources(irr.sets):
+        for name, members in source.items():
+            names.setdefault(name.encode("ascii", "replace"), members)
+
+    directory = []
+    for name in sorted(names):
+        name_off = fobj.tell()
+        fobj.write(name)
+        members = "\n".join(names[name]).encode("ascii", "replace")
+        directory.append((name_off, len(name), fobj.tell(), len(members)))
+        fobj.write(members)
+    return directory
+
+
+def build_index(paths, path, sources=None):
+    """
+    build an index at path from RPSL dumps, using only sources, if given,
+    in order of preference. returns the DumpIRR stats of the loaded dumps
+    """
+    irr = DumpIRR(paths, sources=sources)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fobj:
+        fobj.write(bytes(HEADER.size))
+
+        tables = []
+        for proto in (4, 6):
+            directory = _write_routes(fobj, irr, proto)
+            # align the asn array so it can be used in place
+            fobj.write(bytes(-fobj.tell() % 4))
+            tables.extend((fobj.tell(), len(directory)))
+            fobj.write(array("I", [asn for asn, _ in directory]).tobytes())
+            for _, entry in directory:
+                fobj.write(ROUTE_DIR.pack(*entry))
+
+        directory = _write_sets(fobj, irr)
+        tables.extend((fobj.tell(), len(directory)))
+        for entry in directory:
+            fobj.write(SET_DIR.pack(*entry))
+
+        fobj.seek(0)
+        fobj.write(HEADER.pack(MAGIC, VERSION, *tables))
+    os.replace(tmp, path)
+    return irr.stats
+
+
+class IndexIRR(OfflineIRRBase):
+    """
+    IRR backend answering queries from an index written by build_index
+
+    the index is memory mapped and searched in place, so opening it is
+    instant and only the pages touched by a query are read
+
+    with IndexIRR("irr.idx") as irr:
+        irr.get_prefixes("AS-20C")
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.log = logging.getLogger(__name__)
+
+        with open(path, "rb") as fobj:
+            self._mm = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, *tables = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} bgpfu index")
+        self._sets_dir = tables[4:6]
+
+        # asn arrays are searched in place, on little endian hosts
+        self._view = memoryview(self._mm)
+        self._routes_dir = {}
+        for proto, (start, count) in ((4, tables[0:2]), (6, tables[2:4])):
+            keys = self._view[start : start + count * 4]
+            if sys.byteorder == "little":
+                keys = keys.cast("I")
+            else:
+                keys = array("I", keys)
+                keys.byteswap()
+            self._routes_dir[proto] = (keys, start + count * 4)
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def close(self):
+        if self._mm is None:
+            return
+        if getattr(self, "_view", None) is not None:
+            for keys, _ in self._routes_dir.values():
+                if isinstance(keys, memoryview):
+                    keys.release()
+            self._view.release()
+            self._view = None
+        self._mm.close()
+        self._mm = None
+
+    def set_sources(self, *sources):
+        """sources are picked when the index is built, see build_index"""
+        raise ValueError(
+            f"{self.path} can't select sources, build the index with only those sources"
+        )
+
+    def _find_routes(self, asn, proto):
+        """returns (offset, count) of the prefix records for asn"""
+        keys, start = self._routes_dir[proto]
+        idx = bisect_left(keys, asn)
+        if idx == len(keys) or keys[idx] != asn:
+            return 0, 0
+        return ROUTE_DIR.unpack_from(self._mm, start + idx * ROUTE_DIR.size)
+
+    def _find_set(self, name):
+        """returns the members of set name, None if it doesn't exist"""
+        start, count = self._sets_dir
+        mm = self._mm
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name_off, name_len, members_off, members_len = SET_DIR.unpack_from(
+                mm, start + mid * SET_DIR.size
+            )
+            key = mm[name_off : name_off + name_len]
+            if key < name:
+                lo = mid + 1
+            elif key > name:
+                hi = mid
+            else:
+                members = mm[members_off : members_off + members_len]
+                return members.decode("ascii").split("\n") if members else []
+        return None
+
+    def get_members(self, objs):
+        """
+        get direct members of sets, returns a list with a member list per
+        set, None for sets that don't exist
+        """
+        return [self._find_set(obj.upper().encode("ascii")) for obj in objs]
+
+    def _routes(self, origin, proto):
+        proto = int(proto)
+        if proto not in (4, 6):
+            raise ValueError("unknown protocol '%s'" % str(proto))
+        if not re_asn.match(origin):
+            return []
+
+        offset, count = self._find_routes(int(origin[2:]), proto)
+        size = PREFIX_SIZE[proto]
+        data = self._mm[offset : offset + count * size]
+        if proto == 4:
+            return ["%d.%d.%d.%d/%d" % rec for rec in V4_PREFIX.iter_unpack(data)]
+        return [
+            "{}/{}".format(inet_ntop(AF_INET6, data[i : i + 16]), data[i + 16])
+            for i in range(0, len(data), size)
+        ]
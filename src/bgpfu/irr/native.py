@@ -16,13 +16,13 @@
 
 
 import logging
-import re
 
 import gevent
 from pkg_resources import get_distribution
 
 from bgpfu.io import Empty, Queue, select, socket
-from bgpfu.irr import IRRBase
+from bgpfu.irr import IRRBase, protocol
+from bgpfu.irr.expand import SetExpander
 from bgpfu.prefixlist import SimplePrefixList as PrefixList
 
 
@@ -32,34 +32,35 @@ class IRRClient(IRRBase):
         supports keepalive
     """
 
-    def __init__(self):
+    def __init__(self, host="rr.ntt.net", port=43):
         self.keepalive = True
-        self.host = "whois.radb.net"
-        self.host = "rr.ntt.net"
-        self.port = 43
-
-        self.re_res = re.compile(r"(?P<state>[ACDEF])(?P<len>\d*)(?P<msg>[\w\s]*)$")
+        self.host = host
+        self.port = port
 
         self.log = logging.getLogger(__name__)
 
+        # seconds to wait for a response to start
+        self.timeout = 10
+        # read sizes start small and grow while reads keep filling them
+        self.min_read_size = 4096
+        self.max_read_size = 1 << 20
+
         self.sckt = None
         self._send_queue = Queue()
         self._send_thread = None
+        # responses owed by the server
         self._req_sent = 0
+        self._reset_buffer()
 
     def __enter__(self):
         self.connect()
         return self
 
     def __exit__(self, typ, value, traceback):
-        self.sckt.shutdown(socket.SHUT_RDWR)
-        self.sckt.close()
-        self._send_thread.kill()
-        self._send_thread.get()
+        self.close()
 
     def connect(self):
-        self.sckt = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sckt.connect((self.host, self.port))
+        self.sckt = socket.create_connection((self.host, self.port))
         self.sckt.setblocking(False)
 
         if self.keepalive:
@@ -69,60 +70,103 @@ class IRRClient(IRRBase):
 
         self.query_one("!nBGPFU-{}".format(get_distribution("bgpfu").version))
 
+    def _reset_buffer(self):
+        # received data lives in _rbuf[_rpos:_rend]
+        self._rbuf = bytearray(self.min_read_size)
+        self._rpos = 0
+        self._rend = 0
+        # bytes left of a partially streamed result
+        self._res_remaining = 0
+        self._read_size = self.min_read_size
+
+    def close(self):
+        self._req_sent = 0
+        self._reset_buffer()
+        if self.sckt:
+            try:
+                self.sckt.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # already disconnected
+                pass
+            self.sckt.close()
+            self.sckt = None
+        if self._send_thread:
+            self._send_thread.kill()
+            self._send_thread = None
+
+    def is_connected(self):
+        """
+        check the connection is still usable, without sending a query
+        """
+        if not self.sckt or not self._send_thread or self._send_thread.dead:
+            return False
+        # results pending, can't check the socket
+        if self._req_sent:
+            return True
+        try:
+            # nothing should be readable when idle, unless the server
+            # closed the connection
+            if select.select([self.sckt], [], [], 0)[0]:
+                return False
+        except OSError:
+            return False
+        return True
+
     def make_set_query(self, obj, expand=True):
         """
         if expand is true, also recursively expand members of all sets within the named set.
         """
-        q = "!i" + obj
-        if expand:
-            q = q + ",1"
-        return q
+        return protocol.make_set_query(obj, expand)
 
     def make_route_query(self, obj, proto=4):
-        proto = int(proto)
-        if proto == 4:
-            return "!g" + obj
-        elif proto == 6:
-            return "!6" + obj
-
-        raise ValueError("unknown protocol '%s'" % str(proto))
+        return protocol.make_route_query(obj, proto)
 
     def parse_response(self, response):
-        self.log.debug("response %s", response)
-        match = self.re_res.match(response)
-        if not match:
-            raise RuntimeError(f"invalid response '{response}'")
-
-        state = match.group("state")
-        if state == "A":
-            return int(match.group("len"))
-        elif state == "C":
-            return False
-        elif state == "D":
-            self.log.warning("skipping key not found")
-            return False
-        elif state == "E":
-            raise KeyError("multiple copies of key in database")
-        elif state == "F":
-            if match.group("msg"):
-                msg = match.group("msg").strip()
-            else:
-                msg = "unknown error"
-            raise RuntimeError(msg)
+        return protocol.parse_response(response)
 
-        raise RuntimeError(f"invalid response '{response}'")
-
-    def iter_query(self, querylist):
+    def iter_query(self, querylist, stream=False):
         """
         performs a query, returns a generator
+
+        if stream is true, results are yielded as lists of whitespace
+        separated tokens as data arrives, so a single result may come in
+        several lists
         """
         if not self.sckt:
             raise OSError("not connected")
+        if isinstance(querylist, str):
+            querylist = (querylist,)
+        if not querylist:
+            return
+
+        self._discard_pending()
 
         self.log.debug(f"QUERY {querylist}")
         self._queue_query(querylist)
-        gevent.sleep(0.0001)
-        yield from self._pipeline_read()
+        if stream:
+            yield from self._pipeline_read_tokens(len(querylist))
+            return
+        for res in self._pipeline_read(len(querylist)):
+            if res:
+                yield res
+
+    def iter_responses(self, querylist):
+        """
+        performs a query, yields exactly one result per query, in order,
+        None for queries without one
+        """
+        if not self.sckt:
+            raise OSError("not connected")
+        if isinstance(querylist, str):
+            querylist = (querylist,)
+        if not querylist:
+            return
+
+        self._discard_pending()
+
+        self.log.debug(f"QUERY {querylist}")
+        self._queue_query(querylist)
+        yield from self._pipeline_read(len(querylist))
 
     def query_one(self, query):
         """
@@ -152,6 +196,9 @@ class IRRClient(IRRBase):
             querylist = (querylist,)
         # throw if queue is full
         self._send_queue.put_nowait(querylist)
+        # count responses owed from now, the send thread may not run until
+        # we block on the read
+        self._req_sent += len(querylist)
 
     def _get_send_queue(self):
         max_chunk = 10
@@ -179,124 +226,234 @@ class IRRClient(IRRBase):
             self.log.debug("blocking on send queue")
             querylist = self._get_send_queue()
 
-            qlen = len(querylist)
-            self._req_sent += qlen
-            # self.log.debug("sending {}/{}".format(qlen, self._req_sent))
-            q = "\n".join(querylist) + "\n"
+            q = ("\n".join(querylist) + "\n").encode("ascii")
+            view = memoryview(q)
             ttl = 0
             sz = len(q)
             while ttl < sz:
-                sent = self.sckt.send(q[ttl:].encode("ascii"))
+                try:
+                    sent = self.sckt.send(view[ttl:])
+                except BlockingIOError:
+                    select.select([], [self.sckt], [])
+                    continue
                 if not sent:
                     raise RuntimeError("socket connection broken")
                 ttl = ttl + sent
 
-            self.log.debug(f"sent '{q.rstrip()}' ]{ttl}]")
+            self.log.debug(f"sent {len(querylist)} queries [{ttl}]")
 
-    def _pipeline_read(self):
+    def _pipeline_read(self, count):
+        """
+        read count responses, yields their results, None if there is none
+        """
         if not self._req_sent:
             raise RuntimeError("read called without a queued request")
 
-        reqno = 0
-        buf = ""
-        while reqno < self._req_sent:
-            self.log.debug(f"processing {reqno} of {self._req_sent}")
-            res, buf = self._read_res(buf)
-            reqno += 1
-            if not res:
-                if self._req_sent == 1:
-                    break
-                continue
+        for reqno in range(count):
+            self.log.debug(f"processing {reqno} of {count}")
+            res = self._read_res()
+            self._req_sent -= 1
             yield res
 
-        self._req_sent = 0
+    def _pipeline_read_tokens(self, count):
+        """
+        read count responses, yields lists of result tokens as they arrive
+        """
+        if not self._req_sent:
+            raise RuntimeError("read called without a queued request")
 
-    def _read_res(self, buf=""):
+        for reqno in range(count):
+            self.log.debug(f"streaming {reqno} of {count}")
+            yield from self._iter_res_tokens()
+            self._req_sent -= 1
+
+    def _discard_pending(self):
         """
-        read next response
+        skip responses left over from an abandoned query
         """
-        chunks = []
-        ttl = 0
-        chunk_size = 4096
+        if self._res_remaining:
+            # partially streamed result
+            while self._res_remaining:
+                if self._rpos == self._rend:
+                    self._fill()
+                skip = min(self._rend - self._rpos, self._res_remaining)
+                self._rpos += skip
+                self._res_remaining -= skip
+            self._read_end()
+            self._req_sent -= 1
+
+        while self._req_sent:
+            self.log.debug(f"discarding {self._req_sent} unread responses")
+            pending = self._req_sent
+            try:
+                for _ in self._pipeline_read(pending):
+                    pass
+            except (KeyError, RuntimeError):
+                # errors of abandoned queries are skipped with them
+                if self._req_sent == pending:
+                    raise
+
+    def _fill(self, need=0):
+        """
+        receive more data into the read buffer
 
-        # if we already have data, don't wait at all on the read
-        if buf:
-            timeout = 0
+        reads straight into free space at the end of the buffer, after
+        dropping consumed data or growing it as needed. the read size grows
+        while reads keep filling it, up to max_read_size, and is at least
+        as large as the data we know we're waiting for.
+        """
+        buf = self._rbuf
+        size = min(max(self._read_size, need), self.max_read_size)
+
+        if len(buf) - self._rend < size:
+            # drop consumed data
+            unread = self._rend - self._rpos
+            buf[:unread] = buf[self._rpos : self._rend]
+            self._rpos = 0
+            self._rend = unread
+            if len(buf) - unread < size:
+                buf.extend(bytes(size - (len(buf) - unread)))
+
+        # wait for the first byte of a response, blocking after that since
+        # the rest is on its way
+        if not self._rend - self._rpos:
+            timeout = self.timeout
         else:
-            timeout = 10
-
-        chunk = ""
-        readable = select.select([self.sckt], [], [], timeout)[0]
+            timeout = None
+        if not select.select([self.sckt], [], [], timeout)[0]:
+            raise RuntimeError("no data to read, but no response in buffer")
 
-        if readable:
-            chunk = self.sckt.recv(chunk_size).decode("utf-8")
+        with memoryview(buf) as view:
+            try:
+                read = self.sckt.recv_into(view[self._rend : self._rend + size])
+            except BlockingIOError:
+                return
+        if not read:
+            raise RuntimeError("socket connection broken")
+        self._rend += read
 
-        #        self.log.debug("-- BUF -----\n{}------------".format(buf))
-        #        self.log.debug("-- CHUNK ---\n{}------------".format(chunk))
-        if buf:
-            chunk = buf + chunk
+        if read == size:
+            self._read_size = min(self._read_size * 2, self.max_read_size)
 
-        idx = chunk.find("\n")
-        if idx == -1:
-            raise RuntimeError("no data to read, but no response in buffer")
+    def _read_line(self):
+        """
+        read a line, returns the offsets of its start and end in the buffer
+        """
+        while True:
+            idx = self._rbuf.find(b"\n", self._rpos, self._rend)
+            if idx != -1:
+                start = self._rpos
+                self._rpos = idx + 1
+                return start, idx
+            self._fill()
+
+    def _read_status(self):
+        """
+        read a response status line, returns the result length, if any
+        """
+        start, end = self._read_line()
+        try:
+            return self.parse_response(self._rbuf[start:end].decode("ascii").rstrip())
+        except (KeyError, RuntimeError):
+            # an error status is the whole response
+            self._req_sent -= 1
+            raise
+
+    def _read_end(self):
+        """
+        read the end of response line following a result
+        """
+        start, end = self._read_line()
+        if self._rbuf[start:end].rstrip() != b"C":
+            raise RuntimeError("expected end of response after result")
 
-        response = chunk[:idx]
-        chunk = chunk[idx + 1 :]
+    def _read_res(self):
+        """
+        read next response
 
-        sz = self.parse_response(response)
+        framing works on the raw bytes, A<len> gives the result length in
+        bytes, and the result is only decoded once it is complete
+        """
+        sz = self._read_status()
         if not sz:
-            return None, chunk
-
-        ttl = len(chunk)
-        chunks.append(chunk)
+            return None
 
-        while ttl <= sz:
-            #            self.log.debug("ttl %d, sz %d", ttl, sz)
-            readable = select.select([self.sckt], [], [])[0]
-            if not readable:
-                raise RuntimeError("socket connection broken")
+        # wait for the result and the following C line
+        while self._rend - self._rpos < sz + 2:
+            self._fill(sz + 2 - (self._rend - self._rpos))
 
-            chunk = self.sckt.recv(chunk_size).decode("utf-8")
+        with memoryview(self._rbuf) as view:
+            res = str(view[self._rpos : self._rpos + sz], "utf-8")
+        self._rpos += sz
 
-            if chunk == "":
-                raise RuntimeError("socket connection broken")
-            chunks.append(chunk)
-            ttl = ttl + len(chunk)
+        self._read_end()
+        return res
 
-        # slice off remaining buffer
-        buf_sz = ttl - sz
-        buf = chunks[-1][-buf_sz:]
-        chunks[-1] = chunks[-1][:-buf_sz]
-
-        # try to strip off command complete
-        # FIXME - need to stop eating the last C on a result, it screws up the results
-        buf = buf.lstrip("C")
-        buf = buf.lstrip("\n")
+    def _iter_res_tokens(self):
+        """
+        read next response, yielding lists of whitespace separated tokens
+        from the result as data arrives
 
-        # self.log.debug("-- FINRES ---\n{}\n-- /FINRES ----".format(''.join(chunks)))
-        # self.log.debug("-- FINBUF -----\n{}-- /FINBUF ----".format(buf))
-        # self.log.debug("ttl %d, sz %d", ttl, sz)
-        # self.log.debug("remaining %d '%s'", ttl - sz, buf)
-        return "".join(chunks), buf
+        only the current read is held in the buffer, tokens split across
+        reads are carried over to the next one
+        """
+        sz = self._read_status()
+        if not sz:
+            return
+
+        self._res_remaining = sz
+        while self._res_remaining:
+            avail = min(self._rend - self._rpos, self._res_remaining)
+            end = self._rpos + avail
+            if avail < self._res_remaining:
+                # cut after the last whitespace so no token is split
+                end = 1 + max(
+                    self._rbuf.rfind(b" ", self._rpos, end),
+                    self._rbuf.rfind(b"\n", self._rpos, end),
+                )
+                if end <= self._rpos:
+                    self._fill()
+                    continue
+
+            with memoryview(self._rbuf) as view:
+                tokens = str(view[self._rpos : end], "utf-8").split()
+            self._res_remaining -= end - self._rpos
+            self._rpos = end
+            if tokens:
+                yield tokens
+
+        self._read_end()
 
     def set_sources(self, *sources):
         """set sources to the specified list"""
-        res = self.query("!s{}".format(",".join(sources)))
-        # FIXME - stop eating the last C on a command
-        # if len(res) != 1:
-        #     raise RuntimeError("source query returned multiple results")
-
-        # return res[0]
+        # responds with C on success, errors raise
+        self.query("!s{}".format(",".join(sources)))
         return None
 
-    def iter_sets(self, objs, expand=True):
+    def get_members(self, objs):
+        """
+        get direct members of sets, returns a list with a member list per
+        set, None for sets that don't exist
+        """
+        querylist = [self.make_set_query(obj, expand=False) for obj in objs]
+        return [
+            res.split() if res is not None else None
+            for res in self.iter_responses(querylist)
+        ]
+
+    def iter_sets(self, objs, expand=True, client_side=False):
         """
         Return members of an as-set or route-set.
         if expand is true, also recursively expand members of all sets within the named set.
+        if client_side is true, expansion is done here instead of by the
+        server, see SetExpander
         """
         if isinstance(objs, str):
             objs = (objs,)
 
+        if expand and client_side:
+            return set(SetExpander(self.get_members).expand(objs))
+
         sets = []
         querylist = []
 
@@ -313,8 +470,15 @@ class IRRClient(IRRBase):
 
         return set(sets)
 
-    def iter_routes(self, obj, proto=4):
-        """get routes for specified object"""
+    def get_sets(self, objs, expand=True, client_side=False):
+        return list(self.iter_sets(objs, expand, client_side))
+
+    def iter_routes(self, obj, proto=4, stream=False):
+        """
+        get routes for specified object
+
+        if stream is true, routes are yielded in chunks as they arrive
+        """
         proto = int(proto)
         if proto == 4:
             q = "!g"
@@ -324,25 +488,33 @@ class IRRClient(IRRBase):
             raise ValueError("unknown protocol '%s'" % str(proto))
 
         q += obj
-        prefixes = []
+        if stream:
+            yield from self.iter_query((q,), stream=True)
+            return
         for res in self.iter_query((q,)):
             if res:
                 yield res.split()
 
-    def iter_prefixes(self, as_sets, proto=4):
-        """get prefix list for specified as-set(s)"""
+    def iter_prefixes(self, as_sets, proto=4, stream=False):
+        """
+        get prefix list for specified as-set(s)
+
+        if stream is true, prefixes are yielded in chunks as they arrive,
+        keeping only the current read in memory
+        """
         if isinstance(as_sets, str):
             as_sets = (as_sets,)
         querylist = list(map(self.make_set_query, as_sets))
 
-        # get routes for each AS SET, put directly onto send queue
+        # get members of each AS SET, then pipeline route queries for each
+        # member once
+        members = {}
         for res in self.iter_query(querylist):
-            self._queue_query(list(map(self.make_route_query, res.split())))
-
-        # FIXME - need better handoff to io thread
-        gevent.sleep(0.0001)
-
-        # read results from all requests
-        for res in self._pipeline_read():
-            if res:
-                yield res.split()
+            members.update(dict.fromkeys(res.split()))
+        route_querylist = [self.make_route_query(asn, proto) for asn in members]
+
+        if stream:
+            yield from self.iter_query(route_querylist, stream=True)
+            return
+        for res in self.iter_query(route_querylist):
+            yield res.split()
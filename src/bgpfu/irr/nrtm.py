@@ -0,0 +1,161 @@
+import logging
+import os
+import re
+
+import gevent
+
+from bgpfu.io import socket
+from bgpfu.irr.dump import iter_rpsl
+
+re_op = re.compile(r"^(?P<op>ADD|DEL) (?P<serial>\d+)\s*$")
+re_range = re.compile(r"(?P<first>\d+)-(?P<last>\d+)\s*$")
+
+
+def iter_nrtm(lines, first=None):
+    """
+    parse an NRTMv3 response, yields (operation, serial, object lines) for
+    each ADD or DEL
+
+    raises RuntimeError on errors, or if the response ends before %END so
+    an incomplete object is never yielded. a 401 error for a range starting
+    at first, beyond the last serial, just yields nothing.
+    """
+    op = None
+    obj = []
+    for line in lines:
+        if line.startswith("%END"):
+            if op is not None and obj:
+                yield op + (obj,)
+            return
+
+        if op is None:
+            if line.startswith("%ERROR"):
+                # 401 is also sent for serials too old to be kept
+                match = re_range.search(line)
+                if (
+                    line.startswith("%ERROR:401")
+                    and match
+                    and first is not None
+                    and first > int(match.group("last"))
+                ):
+                    return
+                raise RuntimeError(line.strip())
+            match = re_op.match(line)
+            if match:
+                op = (match.group("op"), int(match.group("serial")))
+            continue
+
+        if line.strip():
+            obj.append(line)
+        elif obj:
+            yield op + (obj,)
+            op = None
+            obj = []
+
+    raise RuntimeError("NRTM response ended without %END")
+
+
+class NRTMClient:
+    """
+    keeps an in memory index up to date from an NRTMv3 mirror stream
+
+    irr is the DumpIRR to update, usually loaded from a dump of source at
+    serial. the current serial is persisted to serial_file, if given, and
+    read from there on startup when no serial is passed. an explicit serial
+    always wins, since the index in irr is only as current as the dump it
+    was loaded from.
+
+    irr = DumpIRR("radb.db.gz")
+    nrtm = NRTMClient(irr, "nrtm.radb.net", source="RADB", serial=12345)
+    gevent.spawn(nrtm.run, 60)
+    """
+
+    def __init__(
+        self,
+        irr,
+        host,
+        port=43,
+        source="RADB",
+        serial=None,
+        serial_file=None,
+    ):
+        self.irr = irr
+        self.host = host
+        self.port = port
+        self.source = source
+        self.serial_file = serial_file
+        self.timeout = 30
+
+        self.log = logging.getLogger(__name__)
+        self.stats = dict(added=0, deleted=0, updates=0)
+
+        if serial_file and os.path.exists(serial_file):
+            with open(serial_file) as fobj:
+                saved = int(fobj.read().strip())
+            if serial is None:
+                serial = saved
+            elif saved > serial:
+                self.log.warning(
+                    f"{serial_file} is at serial {saved}, replaying {source} "
+                    f"updates from serial {serial}"
+                )
+        if serial is None:
+            raise ValueError("no serial given and no serial file to read")
+        self.serial = serial
+
+    def save_serial(self):
+        if not self.serial_file:
+            return
+        tmp = self.serial_file + ".tmp"
+        with open(tmp, "w") as fobj:
+            fobj.write(f"{self.serial}\n")
+        os.replace(tmp, self.serial_file)
+
+    def apply(self, op, serial, lines):
+        """apply a single ADD or DEL of object lines"""
+        if serial <= self.serial:
+            self.log.debug(f"skipping {op} {serial}, already at {self.serial}")
+            return
+        for obj_class, attrs in iter_rpsl(lines):
+            if op == "ADD":
+                self.irr.add_object(obj_class, attrs)
+                self.stats["added"] += 1
+            elif not self.irr.delete_object(obj_class, attrs):
+                self.log.warning(f"DEL {serial} for unknown {obj_class} object")
+            else:
+                self.stats["deleted"] += 1
+        self.serial = serial
+
+    def update(self):
+        """
+        fetch and apply all changes since the current serial, returns how
+        far the serial advanced
+        """
+        query = f"-g {self.source}:3:{self.serial + 1}-LAST\n"
+        self.log.debug(f"NRTM {self.host}:{self.port} {query.strip()}")
+
+        start = self.serial
+        sckt = socket.create_connection((self.host, self.port), self.timeout)
+        try:
+            sckt.sendall(query.encode("ascii"))
+            with sckt.makefile("r", encoding="utf-8", errors="replace") as fobj:
+                for op, serial, lines in iter_nrtm(fobj, start + 1):
+                    self.apply(op, serial, lines)
+        finally:
+            sckt.close()
+
+            if self.serial != start:
+                self.stats["updates"] += 1
+                self.save_serial()
+                self.log.info(f"{self.source} updated to serial {self.serial}")
+
+        return self.serial - start
+
+    def run(self, interval=60):
+        """update forever, every interval seconds"""
+        while True:
+            try:
+                self.update()
+            except (OSError, RuntimeError) as exc:
+                self.log.error(f"NRTM update failed: {exc}")
+            gevent.sleep(interval)
@@ -0,0 +1,80 @@
+import logging
+
+import gevent
+
+from bgpfu.irr import protocol
+
+
+class RoutePlanner:
+    """
+    expands as-sets to routes over a pool of connections
+
+    member ASNs are deduplicated across all requested sets before any route
+    queries are sent, and route queries are split over up to pool.size
+    connections which are queried in parallel.
+
+    stats counts sets, members (including duplicates), route queries sent
+    and queries saved by deduplication for the last expansion
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.log = logging.getLogger(__name__)
+        self.stats = {}
+
+    def expand(self, as_sets):
+        """get unique members of as_sets, in the order first seen"""
+        if isinstance(as_sets, str):
+            as_sets = (as_sets,)
+        querylist = [protocol.make_set_query(obj) for obj in as_sets]
+
+        members = 0
+        unique = {}
+        with self.pool.connection() as irr:
+            for res in irr.iter_query(querylist):
+                for member in res.split():
+                    members += 1
+                    unique.setdefault(member, None)
+
+        self.stats = dict(
+            sets=len(querylist),
+            members=members,
+            queries=len(unique),
+            queries_saved=members - len(unique),
+        )
+        return list(unique)
+
+    def _query(self, querylist):
+        with self.pool.connection() as irr:
+            return [res.split() for res in irr.iter_query(querylist)]
+
+    def iter_prefixes(self, as_sets, proto=4):
+        """
+        get prefix list for specified as-set(s), yields lists of prefixes
+
+        with a single connection, results are streamed as they arrive
+        """
+        querylist = [
+            protocol.make_route_query(asn, proto) for asn in self.expand(as_sets)
+        ]
+        self.log.debug(
+            "{members} members, {queries} route queries, {queries_saved} saved".format(
+                **self.stats
+            )
+        )
+        if not querylist:
+            return
+
+        # one batch per connection, interleaved so each gets a similar mix
+        count = max(1, min(self.pool.size, len(querylist)))
+        if count == 1:
+            with self.pool.connection() as irr:
+                yield from irr.iter_query(querylist, stream=True)
+            return
+
+        jobs = [gevent.spawn(self._query, querylist[i::count]) for i in range(count)]
+        try:
+            for job in jobs:
+                yield from job.get()
+        finally:
+            gevent.killall(jobs)
@@ -0,0 +1,143 @@
+import logging
+from contextlib import contextmanager
+
+from bgpfu.io import Empty, Queue
+from bgpfu.irr.native import IRRClient
+
+
+def parse_host(host, port=43):
+    """
+    parse host, host:port or [v6host]:port strings into a (host, port) tuple
+    """
+    if isinstance(host, tuple):
+        return host
+    if host.startswith("["):
+        host, _, rest = host[1:].partition("]")
+        if rest.startswith(":"):
+            port = int(rest[1:])
+    elif host.count(":") == 1:
+        host, port = host.split(":")
+        port = int(port)
+    return host, port
+
+
+class IRRPool:
+    """
+    pool of persistent keepalive IRRClient connections
+
+    new connections are spread round robin over hosts, failing over to the
+    next host if one can't be reached. idle connections are health checked
+    before being handed out and replaced if they've gone away.
+
+    with pool.connection() as irr:
+        irr.get_prefixes("AS-20C")
+    """
+
+    def __init__(self, hosts=("rr.ntt.net",), size=4, client_cls=IRRClient):
+        if isinstance(hosts, str):
+            hosts = (hosts,)
+        self.hosts = [parse_host(host) for host in hosts]
+        if not self.hosts:
+            raise ValueError("no hosts given")
+        self.size = size
+        self.client_cls = client_cls
+        self.sources = None
+
+        self.log = logging.getLogger(__name__)
+
+        self._idle = Queue()
+        self._created = 0
+        self._next_host = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        self.close()
+
+    def close(self):
+        """close all idle connections"""
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(client)
+
+    def set_sources(self, *sources):
+        """set sources on all connections handed out from now on"""
+        self.sources = sources
+        # idle connections may have other sources set
+        self.close()
+
+    def _connect(self):
+        """connect to the next host, trying each host once"""
+        err = None
+        for _ in range(len(self.hosts)):
+            host, port = self.hosts[self._next_host]
+            self._next_host = (self._next_host + 1) % len(self.hosts)
+            client = self.client_cls(host, port)
+            try:
+                client.connect()
+                if self.sources:
+                    client.set_sources(*self.sources)
+            except (OSError, RuntimeError) as exc:
+                self.log.warning(f"connecting to {host}:{port} failed: {exc}")
+                client.close()
+                err = exc
+                continue
+            self.log.debug(f"connected to {host}:{port}")
+            return client
+        raise ConnectionError(f"unable to connect to any IRR host: {err}")
+
+    def _discard(self, client):
+        self._created -= 1
+        client.close()
+
+    def get(self, timeout=None):
+        """
+        get a connected client, blocks until one is free if the pool is at
+        its size limit
+        """
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except Empty:
+                if self._created < self.size:
+                    self._created += 1
+                    try:
+                        return self._connect()
+                    except ConnectionError:
+                        self._created -= 1
+                        raise
+                client = self._idle.get(timeout=timeout)
+
+            if client.is_connected():
+                return client
+            self.log.info(f"reconnecting dead connection to {client.host}")
+            self._discard(client)
+
+    def put(self, client):
+        """return a client to the pool"""
+        # unread responses would be handed to the next user
+        if client.is_connected() and not client._req_sent:
+            self._idle.put(client)
+        else:
+            self._discard(client)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """context manager handing out a pooled client"""
+        client = self.get(timeout)
+        broken = False
+        try:
+            yield client
+        except (OSError, RuntimeError):
+            # state of the connection is unknown, don't reuse it
+            broken = True
+            raise
+        finally:
+            if broken:
+                self._discard(client)
+            else:
+                self.put(client)
@@ -0,0 +1,60 @@
+"""
+IRRd whois protocol helpers shared by the IRR clients
+"""
+
+import logging
+import re
+
+log = logging.getLogger(__name__)
+
+re_res = re.compile(r"(?P<state>[ACDEF])(?P<len>\d*)(?P<msg>[\w\s]*)$")
+
+
+def make_set_query(obj, expand=True):
+    """
+    if expand is true, also recursively expand members of all sets within the named set.
+    """
+    q = "!i" + obj
+    if expand:
+        q = q + ",1"
+    return q
+
+
+def make_route_query(obj, proto=4):
+    proto = int(proto)
+    if proto == 4:
+        return "!g" + obj
+    elif proto == 6:
+        return "!6" + obj
+
+    raise ValueError("unknown protocol '%s'" % str(proto))
+
+
+def parse_response(response):
+    """
+    parse a response status line, returns the length of the result data to
+    follow, or False if there is none
+    """
+    log.debug("response %s", response)
+    match = re_res.match(response)
+    if not match:
+        raise RuntimeError(f"invalid response '{response}'")
+
+    state = match.group("state")
+    if state == "A":
+        return int(match.group("len"))
+    elif state == "C":
+        return False
+    elif state == "D":
+        log.warning("skipping key not found")
+        return False
+    elif state == "E":
+        raise KeyError("multiple copies of key in database")
+    elif state == "F":
+        if match.group("msg"):
+            msg = match.group("msg").strip()
+        else:
+            msg = "unknown error"
+        raise RuntimeError(msg)
+
+    raise RuntimeError(f"invalid response '{response}'")
@@ -63,3 +63,8 @@ class Output:
             fobj.write("\n".join(data))
             fobj.write("\n")
             return
+
+        # stream anything else line by line
+        for line in data:
+            fobj.write(str(line))
+            fobj.write("\n")
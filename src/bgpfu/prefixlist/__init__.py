@@ -1,4 +1,5 @@
 # namespace
 from .base import PrefixListBase
+from .compact import CompactPrefixList
 from .set import PrefixSet
 from .simple import SimplePrefixList
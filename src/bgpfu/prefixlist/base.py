@@ -2,6 +2,7 @@ import inspect
 import ipaddress
 
 from bgpfu.base import BaseObject
+from bgpfu.prefixlist.parse import make_network, parse_prefix
 
 
 class PrefixListBase(BaseObject):
@@ -13,9 +14,25 @@ class PrefixListBase(BaseObject):
     def check_val(self, v):
         """check value, call ctor if needed"""
         if not isinstance(v, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
-            return ipaddress.ip_network(str(v))
+            return make_network(*self.parse_val(v))
         return v
 
+    def parse_val(self, v):
+        """check value, return integer (network, length, version) tuple"""
+        if isinstance(v, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+            return int(v.network_address), v.prefixlen, v.version
+        if not isinstance(v, (str, bytes)):
+            v = str(v)
+        try:
+            return parse_prefix(v)
+        except ValueError:
+            # let ipaddress handle other notations, or raise its error, but
+            # as text, since it reads 4 or 16 bytes as a packed address
+            if isinstance(v, bytes):
+                v = v.decode("ascii", "replace")
+            prefix = ipaddress.ip_network(v)
+            return int(prefix.network_address), prefix.prefixlen, prefix.version
+
     def make_prefix(self, prefix):
         return self.prefix_ctor(prefix)
 
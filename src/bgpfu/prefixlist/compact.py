@@ -0,0 +1,116 @@
+from array import array
+
+from bgpfu.prefixlist.parse import MAX_PREFIXLEN, NETWORK_CLS, make_network
+from bgpfu.prefixlist.simple import SimplePrefixList, aggregate_pairs
+
+_MASK64 = 2 ** 64 - 1
+
+
+class CompactPrefixList(SimplePrefixList):
+    """
+    SimplePrefixList storing prefixes in parallel integer arrays
+
+    each prefix takes 18 bytes (network split into two 64 bit words, prefix
+    length and ip version), ipaddress objects are only created on access
+    """
+
+    def __init__(self, prefixes=None):
+        self._hi = array("Q")
+        self._lo = array("Q")
+        self._len = array("B")
+        self._ver = array("B")
+        if prefixes:
+            self.iter_add(prefixes)
+
+    def _pack(self, v):
+        net, length, version = self.parse_val(v)
+        return version, net, length
+
+    def _append(self, version, net, length):
+        self._hi.append(net >> 64)
+        self._lo.append(net & _MASK64)
+        self._len.append(length)
+        self._ver.append(version)
+
+    def _network(self, i):
+        net = self._hi[i] << 64 | self._lo[i]
+        return make_network(net, self._len[i], self._ver[i])
+
+    def _iter_pairs(self, version):
+        for i in range(len(self._ver)):
+            if self._ver[i] == version:
+                yield self._hi[i] << 64 | self._lo[i], self._len[i]
+
+    @property
+    def _prefixes(self):
+        return [self._network(i) for i in range(len(self))]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._network(j) for j in range(len(self))[i]]
+        return self._network(range(len(self))[i])
+
+    def __setitem__(self, i, v):
+        if isinstance(i, slice):
+            columns = list(zip(*map(self._pack, v))) or [(), (), ()]
+            versions, nets, lengths = columns
+            self._hi[i] = array("Q", (net >> 64 for net in nets))
+            self._lo[i] = array("Q", (net & _MASK64 for net in nets))
+            self._len[i] = array("B", lengths)
+            self._ver[i] = array("B", versions)
+            return
+
+        version, net, length = self._pack(v)
+        self._hi[i] = net >> 64
+        self._lo[i] = net & _MASK64
+        self._len[i] = length
+        self._ver[i] = version
+
+    def insert(self, i, v):
+        version, net, length = self._pack(v)
+        self._hi.insert(i, net >> 64)
+        self._lo.insert(i, net & _MASK64)
+        self._len.insert(i, length)
+        self._ver.insert(i, version)
+
+    def iter_add(self, it):
+        for v in it:
+            self._append(*self._pack(v))
+
+    def __delitem__(self, i):
+        del self._hi[i]
+        del self._lo[i]
+        del self._len[i]
+        del self._ver[i]
+
+    def __len__(self):
+        return len(self._ver)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactPrefixList):
+            return (
+                self._ver == other._ver
+                and self._len == other._len
+                and self._lo == other._lo
+                and self._hi == other._hi
+            )
+        if isinstance(other, SimplePrefixList):
+            return self._prefixes == other._prefixes
+        raise TypeError("object not PrefixList type")
+
+    @property
+    def ipv4(self):
+        return [NETWORK_CLS[4](pair) for pair in self._iter_pairs(4)]
+
+    @property
+    def ipv6(self):
+        return [NETWORK_CLS[6](pair) for pair in self._iter_pairs(6)]
+
+    def aggregate(self):
+        "returns a PrefixList containing the result of aggregating the list"
+        obj = self.__class__()
+        for version in (4, 6):
+            pairs = aggregate_pairs(self._iter_pairs(version), MAX_PREFIXLEN[version])
+            for net, length in pairs:
+                obj._append(version, net, length)
+        return obj
@@ -0,0 +1,61 @@
+"""
+fast prefix parsing into integer tuples, without going through ipaddress
+"""
+
+from ipaddress import IPv4Network, IPv6Network
+from socket import AF_INET, AF_INET6, inet_pton
+
+NETWORK_CLS = {4: IPv4Network, 6: IPv6Network}
+MAX_PREFIXLEN = {4: 32, 6: 128}
+
+
+def parse_prefix(prefix):
+    """
+    parse a prefix string (or bytes) into an integer (network, length, version)
+    tuple
+
+    raises ValueError on anything ipaddress.ip_network wouldn't accept in
+    strict mode, netmask notation is not supported
+    """
+    if isinstance(prefix, bytes):
+        try:
+            prefix = prefix.decode("ascii")
+        except UnicodeDecodeError:
+            raise ValueError(f"{prefix!r} does not appear to be a prefix")
+
+    addr, sep, length = prefix.partition("/")
+    if ":" in addr:
+        version, family, max_len = 6, AF_INET6, 128
+    else:
+        version, family, max_len = 4, AF_INET, 32
+
+    try:
+        net = int.from_bytes(inet_pton(family, addr), "big")
+    except OSError:
+        raise ValueError(f"'{prefix}' does not appear to be an IPv{version} prefix")
+
+    if not sep:
+        return net, max_len, version
+
+    if not (length.isdigit() and len(length) <= 3 and int(length) <= max_len):
+        raise ValueError(f"invalid prefix length in '{prefix}'")
+    length = int(length)
+
+    if net & ((1 << (max_len - length)) - 1):
+        raise ValueError(f"'{prefix}' has host bits set")
+
+    return net, length, version
+
+
+def iter_parse_prefixes(payload):
+    """
+    parse a whitespace separated payload, such as an IRR route query
+    response, yielding integer (network, length, version) tuples
+    """
+    for token in payload.split():
+        yield parse_prefix(token)
+
+
+def make_network(net, length, version):
+    """create an ipaddress network object from integer values"""
+    return NETWORK_CLS[version]((net, length))
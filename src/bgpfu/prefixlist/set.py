@@ -1,10 +1,108 @@
+import heapq
 import ipaddress
 import re
+from bisect import bisect_left
 from collections.abc import Set
-from operator import itemgetter
+from itertools import islice
 
 from bgpfu.base import BaseObject
 from bgpfu.prefixlist import PrefixListBase
+from bgpfu.prefixlist.parse import MAX_PREFIXLEN
+
+
+def _coalesce_ranges(ranges):
+    """
+    merge overlapping or adjacent ranges from a sorted iterable of
+    (lower, upper) index ranges, returns a list of disjoint ranges
+    """
+    merged = []
+    for lower, upper in ranges:
+        if merged and lower <= merged[-1][1]:
+            if upper > merged[-1][1]:
+                merged[-1] = (merged[-1][0], upper)
+            continue
+        merged.append((lower, upper))
+    return merged
+
+
+def _merge_ranges(ranges):
+    """
+    sort (lower, upper) index ranges and merge overlapping or adjacent ones,
+    returns a sorted list of disjoint ranges
+    """
+    return _coalesce_ranges(sorted(ranges))
+
+
+# the following take sorted lists of disjoint ranges, as kept by PrefixSet,
+# and sweep both lists once
+
+
+def _union_ranges(a, b):
+    return _coalesce_ranges(heapq.merge(a, b))
+
+
+def _intersect_ranges(a, b):
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        lower = max(a[i][0], b[j][0])
+        upper = min(a[i][1], b[j][1])
+        if lower < upper:
+            result.append((lower, upper))
+        # step past whichever range ends first
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _difference_ranges(a, b):
+    result = []
+    j = 0
+    for lower, upper in a:
+        # skip ranges of b that end before this one starts
+        while j < len(b) and b[j][1] <= lower:
+            j += 1
+        # cut out each overlapping range of b
+        k = j
+        while k < len(b) and b[k][0] < upper:
+            if lower < b[k][0]:
+                result.append((lower, b[k][0]))
+            lower = max(lower, b[k][1])
+            k += 1
+        if lower < upper:
+            result.append((lower, upper))
+    return result
+
+
+def _symmetric_difference_ranges(a, b):
+    return _coalesce_ranges(
+        heapq.merge(_difference_ranges(a, b), _difference_ranges(b, a))
+    )
+
+
+def _iter_block_roots(lower, upper):
+    """
+    split a range of indices at a single prefix length into aligned blocks,
+    yield the index of the root prefix of each block's subtree
+    """
+    while lower < upper:
+        # largest aligned block starting at lower that fits in the range
+        size = lower & -lower
+        while size > upper - lower:
+            size >>= 1
+        yield lower // size
+        lower += size
+
+
+def _iter_chunks(it, chunk_size):
+    """yield lists of up to chunk_size items from it"""
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class PrefixSet(PrefixListBase, Set):
@@ -24,9 +122,9 @@ class PrefixSet(PrefixListBase, Set):
         # save meta information
         self._meta = kwargs
         self.log.debug(msg="creating prefix sets")
-        # create sets per address family to hold prefix range tuples as
-        # lower and upper bounds for prefix indices
-        self._sets = {"ipv4": set(), "ipv6": set()}
+        # create sorted lists per address family to hold disjoint prefix
+        # range tuples as lower and upper bounds for prefix indices
+        self._sets = {"ipv4": [], "ipv6": []}
         for af in data:
             # determine the ip address version that we're dealing with
             try:
@@ -93,42 +191,48 @@ class PrefixSet(PrefixListBase, Set):
                     left *= 2
                     right = 2 * right + 1
                 self.log.debug(msg="indexing %s^%d-%d complete" % (prefix, m, n))
-            # sort temp list by lower bound values
-            temp.sort(key=itemgetter(0))
-            # get reference to the correct set
-            s = self.sets(af)
-            # loop through the resulting range entries and
-            # merge into the smallest set of entries
-            lower, upper = None, None
-            for next_lower, next_upper in temp:
-                if lower is None:
-                    lower = next_lower
-                    upper = next_upper
-                    continue
-                if upper < next_lower:
-                    s.add((lower, upper))
-                    lower = next_lower
-                upper = next_upper
-            else:
-                if upper is not None:
-                    s.add((lower, upper))
+            # merge the resulting range entries into the smallest
+            # sorted list of entries
+            self._sets["ipv%d" % version] = _merge_ranges(self.sets(version) + temp)
         self.log_init_done()
 
-    def __contains__(self, item):
+    def _key(self, item):
+        """get the (version, index) tuple for an item"""
         if isinstance(item, tuple):
-            version = item[0]
-            index = item[1]
-        else:
-            try:
-                prefix, index = self.index_of(prefix=item)
-            except ValueError as e:
-                self.log.error(msg=str(e))
-                raise e
-            version = prefix.version
-        for lower, upper in self.sets(version):
-            if lower <= index < upper:
-                return True
-        return False
+            return item[0], item[1]
+        try:
+            net, length, version = self.parse_val(item)
+        except ValueError as e:
+            self.log.error(msg=str(e))
+            raise e
+        return version, (1 << length) + (net >> (MAX_PREFIXLEN[version] - length))
+
+    def __contains__(self, item):
+        version, index = self._key(item)
+        ranges = self.sets(version)
+        # find the last range with a lower bound <= index
+        i = bisect_left(ranges, (index + 1,)) - 1
+        return i >= 0 and index < ranges[i][1]
+
+    def contains_many(self, items):
+        """
+        test membership of many items at once
+
+        items are sorted and swept against the ranges in a single pass,
+        returns a list of booleans in the same order as items
+        """
+        keys = [self._key(item) for item in items]
+        result = [False] * len(keys)
+        pos = {4: 0, 6: 0}
+        for i in sorted(range(len(keys)), key=keys.__getitem__):
+            version, index = keys[i]
+            ranges = self.sets(version)
+            j = pos[version]
+            while j < len(ranges) and ranges[j][1] <= index:
+                j += 1
+            pos[version] = j
+            result[i] = j < len(ranges) and ranges[j][0] <= index
+        return result
 
     def __iter__(self):
         for version in (4, 6):
@@ -146,15 +250,20 @@ class PrefixSet(PrefixListBase, Set):
         return count
 
     def _iter_ranges(self, versions=(4, 6), length=None):
+        """
+        iterate over (version, lower, upper) ranges, split so that each
+        only holds indices of a single prefix length
+        """
         if isinstance(versions, int):
             versions = (versions,)
         for version in versions:
             for lower, upper in self.sets(version):
-                if length is None:
-                    yield (version, lower, upper)
-                else:
-                    if self.length_from_index(lower) == length:
-                        yield (version, lower, upper)
+                while lower < upper:
+                    # the first index at the next prefix length
+                    end = min(upper, 1 << lower.bit_length())
+                    if length is None or self.length_from_index(lower) == length:
+                        yield (version, lower, end)
+                    lower = end
 
     @classmethod
     def _from_iterable(cls, it):
@@ -167,7 +276,7 @@ class PrefixSet(PrefixListBase, Set):
             except IndexError:
                 upper = lower + 1
             try:
-                self.sets(af).add((lower, upper))
+                self.sets(af).append((lower, upper))
             except KeyError as e:
                 self.log.error(msg=str(e))
                 raise e
@@ -175,63 +284,62 @@ class PrefixSet(PrefixListBase, Set):
         return self
 
     def _merge(self):
-        for version in (4, 6):
-            s = self.sets(version)
-            merged = set()
-            try:
-                temp = sorted(list(s), key=itemgetter(0))
-            except IndexError:
-                continue
-            lower, upper = None, None
-            for next_lower, next_upper in temp:
-                if lower is None:
-                    lower = next_lower
-                    upper = next_upper
-                    continue
-                if upper < next_lower:
-                    merged.add((lower, upper))
-                    lower = next_lower
-                upper = next_upper
-            else:
-                if upper is not None:
-                    merged.add((lower, upper))
-            s = merged
-        return
+        for af in self._sets:
+            self._sets[af] = _merge_ranges(self._sets[af])
+
+    def _combine(self, other, func):
+        """create a new set by applying func to the ranges of both sets"""
+        obj = self.__class__({})
+        for af in obj._sets:
+            obj._sets[af] = func(self.sets(af), other.sets(af))
+        return obj
 
     def __and__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        it = list()
-        for i_version, i_lower, i_upper in other._iter_ranges():
-            for j_version, j_lower, j_upper in self._iter_ranges():
-                if i_version == j_version:
-                    v = i_version
-                    l = max(i_lower, j_lower)
-                    u = min(i_upper, j_upper)
-                    if l <= u:
-                        it.append((v, l, u))
-        return self._from_iterable(it)
+        return self._combine(other, _intersect_ranges)
 
     def __or__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        it = list(self._iter_ranges()) + list(other._iter_ranges())
-        return self._from_iterable(it)
+        return self._combine(other, _union_ranges)
+
+    def __sub__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._combine(other, _difference_ranges)
+
+    def __xor__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return self._combine(other, _symmetric_difference_ranges)
+
+    def __le__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        # ranges are kept merged, so a subset has no ranges left after
+        # removing the other set's
+        return not any(
+            _difference_ranges(self.sets(af), other.sets(af)) for af in self._sets
+        )
+
+    def __ge__(self, other):
+        if not isinstance(other, self.__class__):
+            return NotImplemented
+        return other <= self
+
+    def isdisjoint(self, other):
+        if not isinstance(other, self.__class__):
+            return super().isdisjoint(other)
+        return not any(
+            _intersect_ranges(self.sets(af), other.sets(af)) for af in self._sets
+        )
 
     def iter_add(self, it):
         for item in it:
-            prefix = self.check_val(item)
-            af = "ipv%d" % prefix.version
-            lower = item[1]
-            try:
-                upper = item[2]
-            except IndexError:
-                upper = lower + 1
-            try:
-                self.sets(af).add((lower, upper))
-            except KeyError as e:
-                self.log.error(msg=str(e))
-                raise e
+            version, index = self._key(item)
+            self.sets(version).append((index, index + 1))
+        self._merge()
         return self
 
     def sets(self, af=None):
@@ -245,87 +353,77 @@ class PrefixSet(PrefixListBase, Set):
                 self.log.error(msg=str(f))
                 raise f
 
+    def iter_ranges(self, versions=(4, 6)):
+        """
+        iterate over contiguous blocks of prefixes of the same length without
+        expanding them, yields (first prefix, number of prefixes) tuples
+        """
+        for version, lower, upper in self._iter_ranges(versions):
+            yield self.indexed_by(index=lower, af="ipv%d" % version), upper - lower
+
+    def _iter_prefixes(self, versions):
+        for first, count in self.iter_ranges(versions):
+            cls = type(first)
+            length = first.prefixlen
+            net = int(first.network_address)
+            step = 1 << (first.max_prefixlen - length)
+            for i in range(count):
+                yield cls((net + i * step, length))
+
+    def iter_prefixes(self, versions=(4, 6), limit=None, chunk_size=None):
+        """
+        lazily iterate over the prefixes in the set, stopping after limit
+        prefixes if given
+
+        if chunk_size is given, yields lists of up to chunk_size prefixes
+        """
+        if isinstance(versions, int):
+            versions = (versions,)
+        it = self._iter_prefixes(versions)
+        if limit is not None:
+            it = islice(it, limit)
+        if chunk_size:
+            return _iter_chunks(it, chunk_size)
+        return it
+
     def prefixes(self):
-        for version, index in self:
-            yield self.indexed_by(index=index, af="ipv%d" % version)
+        yield from self.iter_prefixes()
+
+    def str_list(self):
+        return list(map(str, self.iter_prefixes()))
 
     def data(self, aggregate=True):
         data = {"ipv4": [], "ipv6": []}
         if aggregate:
-            # build a list of subtrees
-            subtrees = list()
-            # iterate through the ranges in the set
+            # split the ranges at each prefix length into aligned blocks,
+            # each block being the subtree of a root prefix at that length.
+            # ranges are sorted by index, so by length, and blocks with the
+            # same root at consecutive lengths join into one entry
+            roots = dict()
             for version, lower, upper in self._iter_ranges():
-                root = lower
-                # iterate through the root nodes in each range
-                while root < upper:
-                    # get the length of the root node
-                    length = self.length_from_index(root)
-                    left = right = root
-                    depth = 0
-                    while True:
-                        found = False
-                        # get the subtree min and max at the next depth
-                        left *= 2
-                        right = 2 * right + 1
-                        # get the ranges at the current depth
-                        for v, next_lower, next_upper in self._iter_ranges(
-                            versions=version, length=length + depth + 1
-                        ):
-                            if next_lower <= left and next_upper >= right:
-                                found = True
-                                break
-                        if found:
-                            depth += 1
-                        else:
-                            break
-                    # check whether the subtree is already covered
-                    covered = False
-                    for st in subtrees:
-                        # check vertically
-                        if (st["min"] <= length) and (length + depth <= st["max"]):
-                            # check horizontally
-                            left = st["root"] * 2 ** (length - st["min"])
-                            right = (st["root"] + 1) * 2 ** (length - st["min"]) - 1
-                            if left <= root <= right:
-                                covered = True
-                    if not covered:
-                        subtrees.append(
-                            {
-                                "version": version,
-                                "root": root,
-                                "min": length,
-                                "max": length + depth,
-                            }
-                        )
-                    root += 1
-            # loop through the list of subtrees, and aggregate
-            while subtrees:
-                st = subtrees.pop()
-                branch = st["root"] % 2
-                for st_other in subtrees:
-                    if not st["version"] == st_other["version"]:
-                        continue
-                    if not st["min"] == st_other["min"]:
-                        continue
-                    if not st["max"] == st_other["max"]:
-                        continue
-                    diff = st["root"] - st_other["root"]
-                    if (branch == 0 and diff == -1) or (branch == 1 and diff == 1):
-                        subtrees.remove(st_other)
-                        st["root"] = (st["root"] - branch) // 2
-                        subtrees.append(st)
-                        break
-                else:
-                    af = "ipv%d" % st["version"]
-                    prefix = self.indexed_by(st["root"], af=af)
-                    length = prefix.prefixlen
-                    entry = {"prefix": str(prefix)}
-                    if st["min"] != length:
-                        entry["greater-equal"] = st["min"]
-                    if st["max"] != length:
-                        entry["less-equal"] = st["max"]
-                    data[af].append(entry)
+                length = self.length_from_index(lower)
+                for root in _iter_block_roots(lower, upper):
+                    runs = roots.setdefault((version, root), [])
+                    if runs and runs[-1][1] == length - 1:
+                        runs[-1][1] = length
+                    else:
+                        runs.append([length, length])
+            entries = list()
+            for (version, root), runs in roots.items():
+                af = "ipv%d" % version
+                prefix = self.indexed_by(root, af=af)
+                for min_length, max_length in runs:
+                    entries.append((af, prefix, min_length, max_length))
+            entries.sort(
+                key=lambda e: (e[0], e[1].network_address, e[1].prefixlen, e[2])
+            )
+            for af, prefix, min_length, max_length in entries:
+                entry = {"prefix": str(prefix)}
+                if min_length != prefix.prefixlen:
+                    entry["greater-equal"] = min_length
+                if max_length != prefix.prefixlen:
+                    entry["less-equal"] = max_length
+                data[af].append(entry)
         else:
             for prefix in self.prefixes():
                 af = "ipv%d" % prefix.version
@@ -15,58 +15,56 @@
 # limitations under the License.
 
 import collections.abc
-import ipaddress
 
 from bgpfu.prefixlist import PrefixListBase
 
 
-def _try_combine(aggregate, current):
-    "try combining and replacing the last element on the aggregate list"
-    if aggregate and aggregate[-1]:
-        supernet = aggregate[-1].supernet()
-        if supernet == current.supernet():
-            aggregate[-1] = supernet
-            return True
-    return False
-
-
-def _do_aggregate(prefixlist):
-    if len(prefixlist) <= 1:
-        return prefixlist
-    prefixlist = sorted(prefixlist)
+def aggregate_pairs(pairs, max_prefixlen):
+    """
+    aggregate integer (network, length) pairs of a single address family
 
-    # TODO check for default and skip it?
+    sorts once, then merges in a single pass using a stack: prefixes covered
+    by the last aggregate are dropped and sibling prefixes are joined into
+    their supernet until no more joins are possible.
 
-    aggregate = []
-    while True:
-        current = None
-        for pfx in prefixlist:
-            if not current:
-                current = pfx
+    returns a sorted list of (network, length) pairs
+    """
+    stack = []
+    for net, length in sorted(pairs):
+        if stack:
+            top_net, top_len = stack[-1]
+            # sorted input means anything overlapping the last aggregate
+            # is covered by it
+            if net < top_net + (1 << (max_prefixlen - top_len)):
                 continue
 
-            if current.overlaps(pfx):
-                continue
+        stack.append((net, length))
 
-            # try joining 2
-            supernet = current.supernet()
-            if supernet == pfx.supernet():
-                current = supernet
-                continue
+        # join with the previous aggregate while they are siblings
+        while len(stack) > 1 and length:
+            prev_net, prev_len = stack[-2]
+            size = 1 << (max_prefixlen - length)
+            if prev_len != length or prev_net & size or prev_net + size != net:
+                break
+            stack.pop()
+            net, length = prev_net, length - 1
+            stack[-1] = (net, length)
 
-            # nothing to combine, shift
-            aggregate.append(current)
-            current = pfx
+    return stack
 
-        if current:
-            if not _try_combine(aggregate, current):
-                aggregate.append(current)
 
-        if len(aggregate) == len(prefixlist):
-            return aggregate
+def _do_aggregate(prefixlist):
+    if len(prefixlist) <= 1:
+        return prefixlist
+
+    # TODO check for default and skip it?
 
-        prefixlist = aggregate
-        aggregate = []
+    cls = type(prefixlist[0])
+    pairs = aggregate_pairs(
+        ((int(pfx.network_address), pfx.prefixlen) for pfx in prefixlist),
+        prefixlist[0].max_prefixlen,
+    )
+    return [cls(pair) for pair in pairs]
 
 
 class SimplePrefixList(PrefixListBase, collections.abc.MutableSequence):
@@ -77,7 +75,7 @@ class SimplePrefixList(PrefixListBase, collections.abc.MutableSequence):
 
     def __init__(self, prefixes=None):
         if prefixes:
-            self._prefixes = list(map(ipaddress.ip_network, list(map(str, prefixes))))
+            self._prefixes = list(map(self.check_val, prefixes))
         else:
             self._prefixes = []
 
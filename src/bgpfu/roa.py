@@ -1,66 +1,236 @@
+import gc
+import io
 import ipaddress
+import itertools
 import json
 import logging
+import math
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
 
-import radix
+from bgpfu.cache import MemoryCache
+from bgpfu.io import open_compressed
+from bgpfu.prefixlist.parse import MAX_PREFIXLEN, make_network, parse_prefix
+from bgpfu.vrp import VRPStore
 
 logger = logging.getLogger(__name__)
 
 
-def parse_roa(roa):
-    """Parses an roa record in place and returns the result."""
+def parse_vrp(prefix, asn, max_length):
+    """
+    Parses a VRP into a (net, length, version), (asn, maxLength) tuple.
+
+    Raises ValueError if it's invalid.
+    """
+    prefix = parse_prefix(prefix)
+    if not isinstance(asn, int):
+        asn = int(asn.upper().replace("AS", ""))
+    # check bounds on asn
+    if not 0 <= asn < 2 ** 32:
+        raise ValueError(f"asn {asn} is out of range")
+    max_length = int(max_length)
+    if not prefix[1] <= max_length <= MAX_PREFIXLEN[prefix[2]]:
+        raise ValueError(f"maxLength {max_length} is out of range for {prefix[1]}")
+    return prefix, (asn, max_length)
+
+
+def _parse_rib_vrps(line):
+    """
+    Parses a line from a rib file into (net, length, version),
+    [(asn, maxLength), ...], returns None for lines without any.
+    """
+    if line[:1] == "#" or not line.strip():
+        return None
     try:
-        roa["prefix"] = ipaddress.ip_network(roa["prefix"])
-        if not isinstance(roa["asn"], int):
-            roa["asn"] = int(roa["asn"].replace("AS", ""))
-        roa["maxLength"] = int(roa["maxLength"])
-        # check bounds on asn
-        if not 0 <= roa["asn"] < 2 ** 32:
-            raise ValueError(f"asn {roa['asn']} is out of range")
+        prefix_str, asns = line.split()
+        prefix = parse_prefix(prefix_str)
+        length = prefix[1]
     except ValueError as exc:
-        logger.warning(str(exc))
+        line = line.rstrip()
+        logger.warning(f"Could not parse line '{line}': {exc}")
         return None
 
-    return roa
+    vrps = []
+    for asn in asns.split("|"):
+        try:
+            asn = int(asn)
+            # check bounds on asn
+            if not 0 <= asn < 2 ** 32:
+                raise ValueError(f"asn {asn} is out of range")
+            vrps.append((asn, length))
+        except ValueError:
+            line = line.rstrip()
+            logger.warning(f"Could not parse asn from line '{line}'")
+    return prefix, vrps
 
 
-def parse_rib_line(line):
+def iter_rib_routes(filename):
+    """
+    Reads a rib file, plain or compressed, and yields (prefix_str, origin)
+    for each origin of each prefix.
     """
-    Parses a line from a rib file and yields prefix_str, roa.
+    with open_compressed(filename) as fh:
+        for line in fh:
+            if line[:1] == "#" or not line.strip():
+                continue
+            try:
+                prefix_str, asns = line.split()
+            except ValueError:
+                line = line.rstrip()
+                logger.warning(f"Could not parse line '{line}'")
+                continue
+            for asn in asns.split("|"):
+                try:
+                    yield prefix_str, int(asn)
+                except ValueError:
+                    line = line.rstrip()
+                    logger.warning(f"Could not parse asn from line '{line}'")
+
+
+class _JSONStream:
+    """Incremental reader for JSON values from a text file."""
+
+    def __init__(self, fh, buf="", chunk_size=1 << 16):
+        self.fh = fh
+        self.buf = buf
+        self.pos = 0
+        self.eof = False
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            raise ValueError("unexpected end of JSON data")
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        data = self.fh.read(self.chunk_size)
+        if not data:
+            self.eof = True
+        self.buf += data
+
+    def peek(self):
+        """Returns the next non whitespace character, "" at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos : self.pos + 1]
+            self._fill()
+
+    def expect(self, chars):
+        """Consumes and returns the next character, which must be in chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of '{chars}' in JSON data, got '{char}'")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodes and returns the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # a number may continue in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_rpki_json(fh, buf="", chunk_size=1 << 16):
     """
+    Parses a validator JSON export incrementally, yields ("roas", roa) for
+    each roa and (key, value) for any other top level key.
 
-    if line[0] == "#":
+    buf is data already read from fh.
+    """
+    stream = _JSONStream(fh, buf, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
         return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == "roas" and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() != "]":
+                while True:
+                    yield key, stream.value()
+                    if stream.expect(",]") == "]":
+                        break
+            else:
+                stream.expect("]")
+        else:
+            yield key, stream.value()
+        if stream.expect(",}") == "}":
+            return
+
+
+def iter_rpki_csv(lines):
+    """
+    Parses a validator CSV export, yields (asn, prefix, maxLength) rows,
+    skipping the header.
+    """
+    for num, line in enumerate(lines):
+        row = line.strip().split(",")
+        if len(row) < 3:
+            continue
+        if num == 0 and not row[0].upper().replace("AS", "").isdigit():
+            continue
+        yield row[0], row[1], row[2]
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Pause garbage collection, loading creates millions of containers that
+    would otherwise trigger repeated full collections.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
     try:
-        prefix_str, asns = tuple(line.split())
-        prefix = ipaddress.ip_network(prefix_str)
-    except Exception as exc:
-        line = line.rstrip()
-        logger.warning(f"Could not parse line '{line}': {exc}")
-        return
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
-    for asn in asns.split("|"):
-        try:
-            yield prefix_str, dict(
-                asn=int(asn), prefix=prefix, maxLength=prefix.prefixlen
-            )
-        except (TypeError, ValueError):
-            line = line.rstrip()
-            logger.warning(f"Could not parse asn from line '{line}'")
+
+def _parse_query(prefix):
+    """Parses a prefix to validate into (net, length, version)."""
+    if isinstance(prefix, str):
+        return parse_prefix(prefix)
+    prefix = ipaddress.ip_network(prefix)
+    return int(prefix.network_address), prefix.prefixlen, prefix.version
 
 
-def _add_node(tree, prefix_str, roa):
-    """Add a node to a radix tree under prefix_str."""
-    node = tree.search_exact(prefix_str)
-    if not node:
-        node = tree.add(prefix_str)
-    node.data.setdefault("roas", []).append(roa)
+def _roa_dict(net, length, version, vrp):
+    """Build a roa dict for results from a stored vrp tuple."""
+    return dict(asn=vrp[0], prefix=make_network(net, length, version), maxLength=vrp[1])
 
 
 class RoaTree:
-    def __init__(self, rib_file=None, rpki_file=None):
-        """Creates an instance of RoaTree from passed file."""
+    def __init__(self, rib_file=None, rpki_file=None, cache_size=None):
+        """Creates an instance of RoaTree from passed file.
+
+        cache_size enables an LRU cache of that many validation_state
+        results, cleared whenever a file is loaded. Cached results are
+        shared, so callers must not modify them.
+        """
         self.meta = dict()
+        self._store = VRPStore()
+        self._cache = None
+        if cache_size:
+            self._cache = MemoryCache(ttl=math.inf, max_entries=cache_size)
 
         if rib_file and rpki_file:
             raise ValueError("rib and rpki are mutually exclusive")
@@ -71,45 +241,148 @@ class RoaTree:
         if rpki_file:
             self.load_rpki_file(rpki_file)
 
-    def load_rib_file(self, filename, merge=False):
+    def load_rib_file(self, filename, merge=False, batch_size=10000):
         """Loads a rib file into the tree.
 
+        The file may be plain, gzip or bzip2 compressed and is read lazily,
+        roas are added in batches of batch_size prefixes.
+
         Merge=True adds to the current tree
         """
         if merge:
-            tree = self._tree
+            store = self._store
         else:
-            tree = radix.Radix()
-
-        with open(filename) as fh:
-            for line in fh.readlines():
-                for prefix_str, roa in parse_rib_line(line):
-                    _add_node(tree, prefix_str, roa)
+            store = VRPStore()
+
+        start = time.perf_counter()
+        lines = roas = 0
+        batch = {}
+        with _gc_paused(), open_compressed(filename) as fh:
+            for line in fh:
+                lines += 1
+                parsed = _parse_rib_vrps(line)
+                if not parsed:
+                    continue
+                prefix, vrps = parsed
+                roas += len(vrps)
+                batch.setdefault(prefix, []).extend(vrps)
+                if len(batch) >= batch_size:
+                    store.update(batch)
+                    batch.clear()
+            store.update(batch)
+
+        elapsed = time.perf_counter() - start
+        stats = dict(
+            lines=lines,
+            roas=roas,
+            seconds=round(elapsed, 3),
+            lines_per_sec=int(lines / elapsed) if elapsed else 0,
+        )
+        logger.info(
+            f"loaded {roas} roas from {lines} lines of {filename} in "
+            f"{elapsed:.2f}s, {stats['lines_per_sec']} lines/s"
+        )
 
         if merge:
             self.meta.setdefault("filename", []).append(filename)
         else:
             self.meta["filename"] = [filename]
         self.meta["type"] = "rib"
-        self._tree = tree
-
-    def load_rpki_file(self, filename):
-        """Loads a rpki json file."""
-        with open(filename) as fh:
-            data = json.load(fh)
-        tree = radix.Radix()
-
-        for roa in data["roas"]:
-            prefix_str = roa["prefix"]
-            roa = parse_roa(roa)
-            if not roa:
-                continue
-            _add_node(tree, prefix_str, roa)
+        self.meta["stats"] = stats
+        self._store = store
+        self._clear_cache()
+
+    def load_rpki_file(self, filename, batch_size=10000):
+        """Loads a rpki file.
 
-        self.meta = data["metadata"]
+        Accepts the validator JSON export, {"metadata": ..., "roas": [...]},
+        or the CSV export, which are parsed as they're read. The file may be
+        plain, gzip or bzip2 compressed.
+        """
+        store = VRPStore()
+        meta = dict()
+
+        start = time.perf_counter()
+        roas = 0
+        with _gc_paused(), open_compressed(filename) as fh:
+            head = fh.read(1 << 16)
+            if head.lstrip().startswith("{"):
+                rows = []
+                for key, value in iter_rpki_json(fh, head):
+                    if key != "roas":
+                        meta[key] = value
+                        continue
+                    try:
+                        rows.append((value["asn"], value["prefix"], value["maxLength"]))
+                    except (KeyError, TypeError) as exc:
+                        logger.warning(f"invalid roa {value}: {exc}")
+                        continue
+                    if len(rows) >= batch_size:
+                        roas += self._add_rows(store, rows)
+                        rows.clear()
+                roas += self._add_rows(store, rows)
+            else:
+                lines = io.StringIO(head + fh.readline())
+                rows = iter_rpki_csv(itertools.chain(lines, fh))
+                while True:
+                    chunk = list(itertools.islice(rows, batch_size))
+                    if not chunk:
+                        break
+                    roas += self._add_rows(store, chunk)
+
+        elapsed = time.perf_counter() - start
+        stats = dict(
+            roas=roas,
+            seconds=round(elapsed, 3),
+            roas_per_sec=int(roas / elapsed) if elapsed else 0,
+        )
+        logger.info(
+            f"loaded {roas} roas from {filename} in {elapsed:.2f}s, "
+            f"{stats['roas_per_sec']} roas/s"
+        )
+
+        self.meta = meta.get("metadata", meta)
         self.meta["filename"] = [filename]
-        self.meta["type"] = "rib"
-        self._tree = tree
+        self.meta["type"] = "rpki"
+        self.meta["stats"] = stats
+        self._store = store
+        self._clear_cache()
+
+    @staticmethod
+    def _add_rows(store, rows):
+        """Add (asn, prefix, maxLength) rows to store, returns the count added."""
+        batch = {}
+        count = 0
+        for asn, prefix, max_length in rows:
+            try:
+                prefix, vrp = parse_vrp(prefix, asn, max_length)
+            except ValueError as exc:
+                logger.warning(str(exc))
+                continue
+            batch.setdefault(prefix, []).append(vrp)
+            count += 1
+        store.update(batch)
+        return count
+
+    def _clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    @property
+    def cache_stats(self):
+        """
+        Returns validation_state cache hits, misses, hit_rate and size, None
+        if caching is disabled.
+        """
+        if self._cache is None:
+            return None
+        hits, misses = self._cache.stats["hits"], self._cache.stats["misses"]
+        return dict(
+            hits=hits,
+            misses=misses,
+            hit_rate=hits / (hits + misses) if hits + misses else 0.0,
+            size=len(self._cache),
+        )
 
     def check_invalid(self, *args, **kwargs):
         """Check if invalid.
@@ -120,22 +393,22 @@ class RoaTree:
 
     def validate_best(self, prefix, origin):
         """Validate prefix and orgin against most specific match only."""
-        covered_roas = []
-        prefix = ipaddress.ip_network(prefix)
-        prefix_str = str(prefix)
-        vrp = self._tree.search_best(prefix_str)
-        if not vrp:
-            return {"state": "notfound"}
+        net, length, version = _parse_query(prefix)
 
-        vrp_prefix = ipaddress.ip_network(vrp.prefix)
-        if not prefix.subnet_of(vrp_prefix):
+        best = self._store.best_covering(net, length, version)
+        if best is None:
             return {"state": "notfound"}
 
-        for roa in vrp.data["roas"]:
-            if origin == roa["asn"]:
-                return {"state": "valid", "roa": roa}
+        covered_roas = []
+        vrp_net, vrp_len, roas = best
+        for roa in roas:
+            if origin == roa[0]:
+                return {
+                    "state": "valid",
+                    "roa": _roa_dict(vrp_net, vrp_len, version, roa),
+                }
 
-            covered_roas.append(roa)
+            covered_roas.append(_roa_dict(vrp_net, vrp_len, version, roa))
 
         return {"state": "invalid", "roas": covered_roas}
 
@@ -144,34 +417,185 @@ class RoaTree:
         prefix is the to-be-tested prefix
         origin is the origin asn to be used in the test
         """
+        if self._cache is None:
+            return self._validation_state(prefix, origin, check_maxlength)
 
-        tree = self._tree
-        prefix = ipaddress.ip_network(prefix)
-        prefix_str = str(prefix)
+        key = (prefix, origin, check_maxlength)
+        state = self._cache.get(key)
+        if state is None:
+            state = self._validation_state(prefix, origin, check_maxlength)
+            self._cache.set(key, state)
+        return state
 
-        best = tree.search_best(prefix_str)
-        if not tree.search_best(prefix_str):
-            return {"state": "notfound"}
+    def _validation_state(self, prefix, origin, check_maxlength):
+        net, length, version = _parse_query(prefix)
 
         covered_roas = []
-        worst_prefix = tree.search_worst(prefix_str).prefix
+        for vrp_net, vrp_len, roas in self._store.iter_covering(net, length, version):
+            for roa in roas:
+                covered_roas.append((vrp_net, vrp_len, roa))
+                if origin != roa[0]:
+                    continue
 
-        for vrp in tree.search_covered(worst_prefix):
-            vrp_prefix = ipaddress.ip_network(vrp.prefix)
+                if check_maxlength and length > roa[1]:
+                    continue
+                return {
+                    "state": "valid",
+                    "roa": _roa_dict(vrp_net, vrp_len, version, roa),
+                }
 
-            if not prefix.subnet_of(vrp_prefix):
-                continue
+        if not covered_roas:
+            return {"state": "notfound"}
 
-            for roa in vrp.data["roas"]:
-                covered_roas.append(roa)
-                if origin != roa["asn"]:
-                    continue
+        return {
+            "state": "invalid",
+            "roas": [
+                _roa_dict(vrp_net, vrp_len, version, roa)
+                for vrp_net, vrp_len, roa in covered_roas
+            ],
+        }
 
-                if vrp.prefixlen > prefix.prefixlen:
-                    continue
+    def validate_many(self, routes, check_maxlength=True):
+        """
+        Validates many routes, yields (prefix, origin, state) for each,
+        where state is "valid", "invalid" or "notfound".
 
-                if check_maxlength and prefix.prefixlen > roa["maxLength"]:
-                    continue
-                return {"state": "valid", "roa": roa}
+        routes is an iterable of (prefix, origin) or the name of a rib file.
+        Routes are sorted and results are yielded in prefix order, so
+        neighbouring prefixes share their covering VRP lookups. Routes with
+        unparsable prefixes are logged and skipped.
+        """
+        routes, keys = self._sort_routes(routes)
+        for version in (4, 6):
+            yield from _iter_states(
+                self._store, routes, keys[version], version, check_maxlength
+            )
 
-        return {"state": "invalid", "roas": covered_roas}
+    def validate_parallel(self, routes, workers=None, check_maxlength=True):
+        """
+        Validates many routes like validate_many, split over a pool of
+        worker processes, returns a dict of state counts under "counts" and
+        a list of (prefix, origin) under "invalid", in prefix order.
+
+        Routes are split into prefix ranges, one or more per worker. Workers
+        are forked where possible so they share the VRPs copy on write,
+        otherwise the VRPs are pickled to each.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        routes, keys = self._sort_routes(routes)
+
+        # a few ranges per worker to even out their load
+        tasks = []
+        for version in (4, 6):
+            size = -(-len(keys[version]) // (workers * 4)) or 1
+            for start in range(0, len(keys[version]), size):
+                tasks.append((version, start, start + size, check_maxlength))
+
+        for version in (4, 6):
+            # build these once, before workers share them
+            self._store.sorted_keys(version)
+        initargs = (self._store, routes, keys)
+        if workers <= 1 or len(tasks) <= 1:
+            _init_worker(*initargs)
+            try:
+                return _merge_results(map(_validate_range, tasks))
+            finally:
+                _init_worker(None, None, None)
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("fork")
+        else:
+            ctx = multiprocessing.get_context()
+        # keep the collector from touching pages shared with forked workers,
+        # gc.freeze is new in Python 3.7
+        freeze = hasattr(gc, "freeze")
+        if freeze:
+            gc.freeze()
+        try:
+            with ctx.Pool(workers, _init_worker, initargs) as pool:
+                return _merge_results(pool.imap(_validate_range, tasks))
+        finally:
+            if freeze:
+                gc.unfreeze()
+
+    @staticmethod
+    def _sort_routes(routes):
+        """
+        Parses routes into a list of (prefix, origin) and a sorted list of
+        int keys of network, length and list index per family.
+        """
+        if isinstance(routes, str):
+            routes = iter_rib_routes(routes)
+
+        routes = list(routes)
+        keys = {4: [], 6: []}
+        last = parsed = None
+        for index, (prefix, origin) in enumerate(routes):
+            if prefix != last:
+                try:
+                    parsed = _parse_query(prefix)
+                except ValueError as exc:
+                    logger.warning(f"Could not parse prefix '{prefix}': {exc}")
+                    parsed = None
+                last = prefix
+            if parsed:
+                net, length, version = parsed
+                keys[version].append((net << 8 | length) << 32 | index)
+        keys[4].sort()
+        keys[6].sort()
+        return routes, keys
+
+
+def _iter_states(store, routes, keys, version, check_maxlength):
+    """Yields (prefix, origin, state) for routes at sorted keys."""
+    chains = store.iter_covering_sorted(
+        ((key >> 40, key >> 32 & 0xFF) for key in keys), version
+    )
+    for key, chain in zip(keys, chains):
+        prefix, origin = routes[key & 0xFFFFFFFF]
+        if not chain:
+            yield prefix, origin, "notfound"
+            continue
+        length = key >> 32 & 0xFF if check_maxlength else 0
+        for _, _, asns in chain:
+            if asns.get(origin, -1) >= length:
+                yield prefix, origin, "valid"
+                break
+        else:
+            yield prefix, origin, "invalid"
+
+
+# state of validate_parallel workers, inherited on fork
+_worker = None
+
+
+def _init_worker(store, routes, keys):
+    global _worker
+    _worker = (store, routes, keys)
+
+
+def _validate_range(task):
+    """Validates one range of sorted routes in a worker."""
+    version, start, end, check_maxlength = task
+    store, routes, keys = _worker
+    counts = dict(valid=0, invalid=0, notfound=0)
+    invalid = []
+    for prefix, origin, state in _iter_states(
+        store, routes, keys[version][start:end], version, check_maxlength
+    ):
+        counts[state] += 1
+        if state == "invalid":
+            invalid.append((prefix, origin))
+    return dict(counts=counts, invalid=invalid)
+
+
+def _merge_results(results):
+    """Merges the results of _validate_range, in order."""
+    counts = dict(valid=0, invalid=0, notfound=0)
+    invalid = []
+    for result in results:
+        for state, count in result["counts"].items():
+            counts[state] += count
+        invalid.extend(result["invalid"])
+    return dict(counts=counts, invalid=invalid)
@@ -0,0 +1,258 @@
+"""
+compact storage for validated ROA payloads
+"""
+
+from array import array
+from bisect import bisect_right
+
+from bgpfu.prefixlist.parse import MAX_PREFIXLEN
+
+
+def pack_vrp(asn, max_length):
+    """pack an (asn, maxLength) pair into a single int"""
+    if not 0 <= max_length <= 0xFF or asn < 0:
+        raise ValueError(f"can't pack asn {asn} maxLength {max_length}")
+    return asn << 8 | max_length
+
+
+def unpack_vrp(vrp):
+    """unpack an int from pack_vrp into an (asn, maxLength) tuple"""
+    return vrp >> 8, vrp & 0xFF
+
+
+class VRPStore:
+    """
+    VRPs keyed by prefix, with lookups of all prefixes covering a prefix
+
+    prefixes are stored per address family in a dict keyed by their CBT
+    index, (1 << length) + (network >> (max length - length)), holding the
+    prefix's VRPs packed into an int, or a tuple of ints if there are
+    several. the prefix lengths in use are kept sorted per family.
+
+    covering prefixes are found from an index, built on demand after
+    prefixes are added, of the prefixes in sorted order with each one's
+    nearest covering prefix. the most specific cover is found with a
+    bisect, then the rest by following the chain of covering prefixes.
+    with only a few lengths in use, each length is looked up instead.
+    """
+
+    __slots__ = ("_vrps", "_lengths", "_index")
+
+    # skip ahead with a bisect and the index rather than walk this many
+    # prefixes in iter_covering_sorted
+    SKIP = 64
+    # look up each length rather than use the index with this many or fewer
+    PROBE_LENGTHS = 4
+
+    def __init__(self):
+        self._vrps = {4: {}, 6: {}}
+        self._lengths = {4: [], 6: []}
+        # (sorted keys, values, parent positions), built on demand
+        self._index = {4: None, 6: None}
+
+    def __len__(self):
+        """number of prefixes with VRPs"""
+        return len(self._vrps[4]) + len(self._vrps[6])
+
+    def add(self, net, length, version, vrps):
+        """add an iterable of (asn, maxLength) VRPs for a prefix"""
+        index = (1 << length) + (net >> (MAX_PREFIXLEN[version] - length))
+        store = self._vrps[version]
+        packed = tuple(pack_vrp(asn, max_length) for asn, max_length in vrps)
+        if not packed:
+            return
+
+        self._index[version] = None
+        current = store.get(index)
+        if current is None:
+            lengths = self._lengths[version]
+            if length not in lengths:
+                lengths.insert(bisect_right(lengths, length), length)
+        elif isinstance(current, int):
+            packed = (current,) + packed
+        else:
+            packed = current + packed
+        store[index] = packed[0] if len(packed) == 1 else packed
+
+    def update(self, batch):
+        """add VRPs from a dict of (net, length, version): [(asn, maxLength), ...]"""
+        for (net, length, version), vrps in batch.items():
+            self.add(net, length, version, vrps)
+
+    def get(self, net, length, version):
+        """returns the (asn, maxLength) VRPs for a prefix, empty if there are none"""
+        index = (1 << length) + (net >> (MAX_PREFIXLEN[version] - length))
+        return self._unpack(self._vrps[version].get(index))
+
+    @staticmethod
+    def _unpack(value):
+        if value is None:
+            return []
+        if isinstance(value, int):
+            return [unpack_vrp(value)]
+        return [unpack_vrp(vrp) for vrp in value]
+
+    def _build_index(self, version):
+        """
+        returns the prefixes as sorted (network << 8 | length) keys, their
+        values, and the position of each one's nearest covering prefix, -1
+        for none
+        """
+        index = self._index[version]
+        if index is not None:
+            return index
+
+        max_len = MAX_PREFIXLEN[version]
+        store = self._vrps[version]
+        keys = []
+        for cbt in store:
+            length = cbt.bit_length() - 1
+            keys.append((cbt - (1 << length)) << (max_len - length) << 8 | length)
+        keys.sort()
+        # IPv4 keys fit in 40 bits, so they can be kept unboxed
+        if version == 4:
+            keys = array("Q", keys)
+        values = [
+            store[(1 << (key & 0xFF)) + (key >> 8 >> (max_len - (key & 0xFF)))]
+            for key in keys
+        ]
+
+        parents = array("i")
+        # sorted prefixes either nest in the last one or end it
+        stack = []
+        for pos, key in enumerate(keys):
+            net = key >> 8
+            while stack:
+                last = keys[stack[-1]]
+                shift = max_len - (last & 0xFF)
+                if net >> shift << shift == last >> 8:
+                    break
+                stack.pop()
+            parents.append(stack[-1] if stack else -1)
+            stack.append(pos)
+
+        index = self._index[version] = (keys, values, parents)
+        return index
+
+    def sorted_keys(self, version):
+        """sorted (network << 8 | length) keys of the prefixes with VRPs"""
+        return self._build_index(version)[0]
+
+    def _find_best(self, net, length, version):
+        """position in sorted_keys of the most specific cover, -1 for none"""
+        max_len = MAX_PREFIXLEN[version]
+        keys, _, parents = self._build_index(version)
+
+        # the last prefix sorted before this one is either its most
+        # specific cover or nested in it
+        pos = bisect_right(keys, net << 8 | length) - 1
+        while pos >= 0:
+            cover_len = keys[pos] & 0xFF
+            shift = max_len - cover_len
+            if cover_len <= length and net >> shift << shift == keys[pos] >> 8:
+                break
+            pos = parents[pos]
+        return pos
+
+    def _probe_covering(self, net, length, version, lengths):
+        """yields covering prefixes with a lookup for each of lengths"""
+        max_len = MAX_PREFIXLEN[version]
+        store = self._vrps[version]
+        for cover_len in lengths:
+            shift = max_len - cover_len
+            value = store.get((1 << cover_len) + (net >> shift))
+            if value is not None:
+                yield net >> shift << shift, cover_len, self._unpack(value)
+
+    def best_covering(self, net, length, version):
+        """
+        returns (network, length, vrps) for the most specific prefix
+        covering the given prefix, including itself, None if there is none
+        """
+        lengths = self._lengths[version]
+        if len(lengths) <= self.PROBE_LENGTHS:
+            lengths = reversed(lengths[: bisect_right(lengths, length)])
+            return next(self._probe_covering(net, length, version, lengths), None)
+
+        pos = self._find_best(net, length, version)
+        if pos < 0:
+            return None
+        keys, values, _ = self._index[version]
+        return keys[pos] >> 8, keys[pos] & 0xFF, self._unpack(values[pos])
+
+    def iter_covering(self, net, length, version):
+        """
+        yields (network, length, vrps) for each prefix covering the given
+        prefix, including itself, least specific first
+        """
+        lengths = self._lengths[version]
+        if len(lengths) <= self.PROBE_LENGTHS:
+            lengths = lengths[: bisect_right(lengths, length)]
+            yield from self._probe_covering(net, length, version, lengths)
+            return
+
+        pos = self._find_best(net, length, version)
+        keys, values, parents = self._index[version]
+        chain = []
+        while pos >= 0:
+            chain.append(pos)
+            pos = parents[pos]
+        for pos in reversed(chain):
+            yield keys[pos] >> 8, keys[pos] & 0xFF, self._unpack(values[pos])
+
+    def iter_covering_sorted(self, prefixes, version):
+        """
+        yields the covering prefixes of each (network, length) of an
+        iterable sorted by network then length, as a list of (network,
+        length, {asn: maxLength}) least specific first
+
+        the stored prefixes are walked alongside in order, so neighbouring
+        prefixes share their lookups. the list yielded is reused and
+        changes on the next iteration.
+        """
+        max_len = MAX_PREFIXLEN[version]
+        keys, values, _ = self._build_index(version)
+        unpack = self._unpack
+        pos = 0
+        chain = []
+
+        for net, length in prefixes:
+            key = net << 8 | length
+            if pos + self.SKIP < len(keys) and keys[pos + self.SKIP] <= key:
+                # too far to walk, start over from the index
+                pos = bisect_right(keys, key, pos)
+                chain.clear()
+                covering = self.iter_covering(net, length, version)
+            else:
+                end = bisect_right(keys, key, pos)
+                covering = [
+                    (keys[i] >> 8, keys[i] & 0xFF, unpack(values[i]))
+                    for i in range(pos, end)
+                ]
+                pos = end
+
+            for cover_net, cover_len, vrps in covering:
+                # stored prefixes come in order, so each one either nests
+                # in the last or ends it
+                while chain:
+                    last_net, last_len, _ = chain[-1]
+                    shift = max_len - last_len
+                    if (
+                        last_len <= cover_len
+                        and cover_net >> shift << shift == last_net
+                    ):
+                        break
+                    chain.pop()
+                asns = {}
+                for asn, max_length in vrps:
+                    if max_length > asns.get(asn, -1):
+                        asns[asn] = max_length
+                chain.append((cover_net, cover_len, asns))
+
+            while chain:
+                last_net, last_len, _ = chain[-1]
+                shift = max_len - last_len
+                if last_len <= length and net >> shift << shift == last_net:
+                    break
+                chain.pop()
+            yield chain
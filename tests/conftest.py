@@ -1,7 +1,25 @@
 import os
+import socketserver
+import threading
 
 import pytest
 
+# canned responses for the fake IRRd, keyed by query
+IRR_DATA = {
+    "!iAS-TEST,1": "AS64500 AS64501 AS64502",
+    "!iAS-TEST": "AS64500 AS-SUB",
+    "!iAS-SUB,1": "AS64501 AS64502",
+    "!iAS-SUB": "AS64501 AS64502",
+    "!iAS-OTHER,1": "AS64501 AS64503",
+    "!iAS-OTHER": "AS64501 AS64503",
+    "!gAS64500": "192.0.2.0/24 198.51.100.0/24",
+    "!gAS64501": "203.0.113.0/24",
+    "!gAS64502": "192.0.2.0/25 192.0.2.128/25",
+    "!gAS64503": "10.0.0.0/8",
+    "!6AS64500": "2001:db8::/32",
+    "!6AS64502": "2001:db8:1::/48",
+}
+
 
 def _this_dir():
     """
@@ -15,3 +33,61 @@ def _this_dir():
 @pytest.fixture
 def this_dir():
     return _this_dir()
+
+
+class FakeIRRdHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            query = line.decode("ascii").strip()
+            self.server.queries.append(query)
+            if query == "!q":
+                break
+            res = self.server.respond(query)
+            if res:
+                self.wfile.write(res)
+
+
+class FakeIRRd(socketserver.ThreadingTCPServer):
+    """
+    minimal IRRd stand-in answering whois queries from a dict
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.queries = []
+        super().__init__(("127.0.0.1", 0), FakeIRRdHandler)
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def respond(self, query):
+        if query == "!!":
+            return None
+        if query.startswith(("!n", "!s")):
+            return b"C\n"
+        if not query.startswith(("!i", "!g", "!6")):
+            return b"F unrecognized command\n"
+        if query not in self.responses:
+            return b"D\n"
+        data = (self.responses[query] + "\n").encode("utf-8")
+        return b"A%d\n%sC\n" % (len(data), data)
+
+
+@pytest.fixture
+def irrd():
+    server = FakeIRRd(IRR_DATA)
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
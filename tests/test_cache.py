@@ -0,0 +1,97 @@
+import time
+
+from bgpfu.cache import DiskCache, MemoryCache
+
+
+def test_disk_cache(tmpdir):
+    path = str(tmpdir.join("sub", "cache.sqlite"))
+    with DiskCache(path) as cache:
+        assert cache.get("!iAS-TEST") is None
+        assert "x" == cache.get("!iAS-TEST", "x")
+        cache.set("!iAS-TEST", ["AS64500", "AS64501"])
+        assert ["AS64500", "AS64501"] == cache.get("!iAS-TEST")
+        cache.set("!iAS-TEST", [])
+        assert [] == cache.get("!iAS-TEST")
+        assert 1 == len(cache)
+        assert dict(hits=2, misses=2) == cache.stats
+
+    # persisted
+    with DiskCache(path) as cache:
+        assert 1 == len(cache)
+        assert [] == cache.get("!iAS-TEST")
+        cache.clear()
+        assert 0 == len(cache)
+        assert cache.get("!iAS-TEST") is None
+
+
+def test_disk_cache_ttl(tmpdir):
+    with DiskCache(str(tmpdir.join("cache.sqlite")), ttl=0.05) as cache:
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+        assert 1 == cache.get("a")
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert 1 == len(cache)
+        assert 2 == cache.get("b")
+
+        cache.set("c", 3, ttl=0)
+        cache.purge()
+        assert 1 == len(cache)
+
+
+def test_disk_cache_get_many(tmpdir):
+    with DiskCache(str(tmpdir.join("cache.sqlite")), ttl=0.05) as cache:
+        cache.CHUNK = 2
+        assert [None, None] == cache.get_many(["a", "b"])
+        cache.set("a", 1, ttl=60)
+        cache.set("b", [2])
+        cache.set("c", 3, ttl=60)
+        assert [1, [2], None, 1, 3] == cache.get_many(["a", "b", "x", "a", "c"])
+        assert dict(hits=4, misses=3) == cache.stats
+
+        time.sleep(0.1)
+        assert ["x", 1, "x"] == cache.get_many(["b", "a", "y"], "x")
+        assert 2 == len(cache)
+        assert [] == cache.get_many([])
+
+
+def test_disk_cache_evict(tmpdir):
+    with DiskCache(str(tmpdir.join("cache.sqlite")), max_entries=3) as cache:
+        for key in "abc":
+            cache.set(key, key)
+            time.sleep(0.01)
+        # a is now the most recently used
+        assert "a" == cache.get("a")
+        cache.set("d", "d")
+        assert 3 == len(cache)
+        assert cache.get("b") is None
+        assert ["a", "c", "d"] == [cache.get(key) for key in "acd"]
+
+        # get_many marks hits used too
+        assert ["a", None, "c"] == cache.get_many("abc")
+        cache.set("e", "e")
+        assert ["a", "c", "e"] == cache.get_many("ace")
+        assert cache.get("d") is None
+
+
+def test_memory_cache():
+    cache = MemoryCache(ttl=0.05, max_entries=3)
+    assert cache.get("a") is None
+    for key in "abc":
+        cache.set(key, key)
+    # a is now the most recently used
+    assert "a" == cache.get("a")
+    cache.set("d", "d", ttl=60)
+    assert 3 == len(cache)
+    assert cache.get("b") is None
+    assert ["a", "c", "d"] == [cache.get(key) for key in "acd"]
+    assert dict(hits=4, misses=2) == cache.stats
+    assert ["a", None] == cache.get_many("ab")
+
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    cache.purge()
+    assert 1 == len(cache)
+    assert "d" == cache.get("d")
+    cache.clear()
+    assert 0 == len(cache)
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from click.testing import CliRunner
 
@@ -20,3 +22,83 @@ def test_cli_invoke():
     print(res.output)
     assert res.output
     assert res.exit_code == 0
+
+
+def test_cli_host(irrd):
+    runner = CliRunner()
+    host = f"{irrd.host}:{irrd.port}"
+
+    res = runner.invoke(bgpfu.cli.cli, ["as-set", "--host", host, "AS-TEST"])
+    assert res.exit_code == 0
+    assert ["AS64500", "AS64501", "AS64502"] == sorted(res.output.split())
+
+    res = runner.invoke(bgpfu.cli.cli, ["prefixlist", "--host", host, "AS-TEST"])
+    assert res.exit_code == 0
+    assert "192.0.2.0/24\n198.51.100.0/24\n203.0.113.0/24\n" in res.output
+
+
+def test_cli_cache(irrd, tmpdir):
+    runner = CliRunner()
+    args = ["--host", f"{irrd.host}:{irrd.port}", "--cache-dir", str(tmpdir)]
+
+    for _ in range(2):
+        res = runner.invoke(bgpfu.cli.cli, ["prefixlist"] + args + ["AS-TEST"])
+        assert res.exit_code == 0
+        assert "192.0.2.0/24\n198.51.100.0/24\n203.0.113.0/24\n" in res.output
+    # second run served from the cache without connecting
+    assert 1 == irrd.queries.count("!!")
+    assert tmpdir.join("irr.sqlite").check()
+
+
+def test_cli_dump(this_dir, tmpdir):
+    runner = CliRunner()
+    cache_dir = tmpdir.join("cache")
+    args = ["--dump", os.path.join(this_dir, "data", "irr", "test.db")]
+    args += ["--cache-dir", str(cache_dir)]
+
+    res = runner.invoke(bgpfu.cli.cli, ["as-set"] + args + ["AS-TEST"])
+    assert res.exit_code == 0
+    assert ["AS64500", "AS64501", "AS64502"] == sorted(res.output.split())
+
+    res = runner.invoke(bgpfu.cli.cli, ["prefixlist"] + args + ["AS-TEST"])
+    assert res.exit_code == 0
+    assert "192.0.2.0/24\n198.51.100.0/24\n203.0.113.0/24\n" in res.output
+    # the cache isn't used offline
+    assert not cache_dir.check()
+
+
+def test_cli_index(this_dir, tmpdir):
+    runner = CliRunner()
+    path = str(tmpdir.join("test.idx"))
+    dump = os.path.join(this_dir, "data", "irr", "test.db")
+
+    res = runner.invoke(bgpfu.cli.cli, ["index", "build", "-o", path, dump])
+    assert res.exit_code == 0
+    assert "indexed 5 routes and 4 sets" in res.output
+
+    res = runner.invoke(bgpfu.cli.cli, ["prefixlist", "--index", path, "AS-TEST"])
+    assert res.exit_code == 0
+    assert "192.0.2.0/24\n198.51.100.0/24\n203.0.113.0/24\n" in res.output
+
+    args = ["prefixlist", "--index", path, "--sources", "TEST", "AS-TEST"]
+    res = runner.invoke(bgpfu.cli.cli, args)
+    assert res.exit_code == 1
+    assert isinstance(res.exception, ValueError)
+    assert "can't select sources" in str(res.exception)
+
+
+def test_cli_check_rib(this_dir, tmpdir):
+    runner = CliRunner()
+    rpki_file = os.path.join(this_dir, "data", "rpki", "test0.json")
+    rib_file = os.path.join(this_dir, "data", "rib", "test0-v4.txt")
+    path = tmpdir.join("rib.txt")
+    path.write("10.0.4.0/24 12345|63311\n2.0.0.0/24 1\n")
+
+    args = ["check-rib", "--rpki-file", rpki_file, "--workers", "2"]
+    res = runner.invoke(bgpfu.cli.cli, args + ["--show-invalid", rib_file, str(path)])
+    assert res.exit_code == 0
+    assert [
+        f"{rib_file} valid 3 invalid 0 notfound 0",
+        f"{path} valid 1 invalid 1 notfound 1",
+        "  10.0.4.0/24 12345",
+    ] == res.output.splitlines()
@@ -68,3 +68,98 @@ def test_parse_response():
     with pytest.raises(RuntimeError) as excinfo:
         irr.parse_response("F unrecognized command")
     assert "unrecognized command" in str(excinfo.value)
+
+
+def test_queries_local(irrd):
+    with IRRClient(irrd.host, irrd.port) as irr:
+        irr.set_sources("ARIN", "RIPE")
+        iter_res = list(irr.iter_sets("AS-TEST"))
+        get_res = irr.get_sets("AS-TEST")
+        assert ["AS64500", "AS64501", "AS64502"] == sorted(iter_res)
+        assert sorted(iter_res) == sorted(get_res)
+
+        assert [["2001:db8::/32"]] == irr.get_routes("AS64500", 6)
+        assert [] == irr.get_routes("AS64501", 6)
+
+        assert [
+            ["192.0.2.0/24", "198.51.100.0/24"],
+            ["203.0.113.0/24"],
+            ["192.0.2.0/25", "192.0.2.128/25"],
+        ] == irr.get_prefixes("AS-TEST")
+        assert [] == irr.get_prefixes("AS-NONE")
+
+
+def test_query_error(irrd):
+    with IRRClient(irrd.host, irrd.port) as irr:
+        with pytest.raises(RuntimeError) as excinfo:
+            irr.query(["!x", "!gAS64501"])
+        assert "unrecognized command" in str(excinfo.value)
+        # connection is still usable
+        assert ["203.0.113.0/24\n"] == irr.query("!gAS64501")
+        assert 0 == irr._req_sent
+
+        # errors in abandoned queries are skipped
+        it = irr.iter_query(["!gAS64501", "!x", "!gAS64501"])
+        next(it)
+        del it
+        assert ["203.0.113.0/24\n"] == irr.query("!gAS64501")
+
+        with pytest.raises(RuntimeError):
+            list(irr.iter_query(["!x"], stream=True))
+        assert [["203.0.113.0/24"]] == list(irr.iter_query("!gAS64501", stream=True))
+
+
+def test_read_framing(irrd):
+    big = " ".join(f"10.{i >> 8 & 0xFF}.{i & 0xFF}.0/24" for i in range(2 ** 16))
+    irrd.responses = dict(
+        irrd.responses,
+        **{
+            "!gAS-BIG": big,
+            "!iAS-UTF8": "AS-ÄÖÜ AS64500",
+            "!iAS-END": "AS-C C",
+        },
+    )
+
+    irr = IRRClient(irrd.host, irrd.port)
+    # start small so responses are split over many reads
+    irr.min_read_size = 16
+    irr._reset_buffer()
+    with irr:
+        querylist = ["!iAS-UTF8", "!iAS-END", "!gAS-BIG", "!gAS-NONE", "!gAS64501"]
+        res = irr.query(querylist)
+        assert ["AS-ÄÖÜ AS64500\n", "AS-C C\n", big + "\n", "203.0.113.0/24\n"] == res
+        assert irr._read_size > 16
+        assert 0 == irr._req_sent
+
+        # abandoned generators don't break the next query
+        it = irr.iter_query(querylist)
+        next(it)
+        del it
+        assert ["AS-C C\n"] == irr.query("!iAS-END")
+
+
+def test_stream(irrd):
+    big = " ".join(f"10.{i >> 8 & 0xFF}.{i & 0xFF}.0/24" for i in range(2 ** 16))
+    irrd.responses = dict(irrd.responses, **{"!gAS-BIG": big})
+
+    irr = IRRClient(irrd.host, irrd.port)
+    irr.min_read_size = 16
+    irr.max_read_size = 4096
+    irr._reset_buffer()
+    with irr:
+        chunks = list(irr.iter_routes("AS-BIG", stream=True))
+        assert len(chunks) > 1
+        assert big.split() == [token for chunk in chunks for token in chunk]
+        # only a single read is buffered
+        assert len(irr._rbuf) <= 2 * irr.max_read_size
+
+        expected = sorted(sum(irr.get_prefixes("AS-TEST"), []))
+        chunks = irr.iter_prefixes("AS-TEST", stream=True)
+        assert expected == sorted(token for chunk in chunks for token in chunk)
+
+        # abandoned partial stream is skipped
+        it = irr.iter_routes("AS-BIG", stream=True)
+        next(it)
+        del it
+        assert ["203.0.113.0/24\n"] == irr.query("!gAS64501")
+        assert 0 == irr._req_sent
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from bgpfu.irr import AsyncIRRClient
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_init():
+    assert AsyncIRRClient()
+
+
+def test_queries(irrd):
+    async def queries():
+        async with AsyncIRRClient(irrd.host, irrd.port) as irr:
+            await irr.set_sources("ARIN", "RIPE")
+
+            assert ["AS64500", "AS64501", "AS64502"] == await irr.get_sets("AS-TEST")
+            assert ["AS64500", "AS-SUB"] == await irr.get_sets("AS-TEST", expand=False)
+            assert [["2001:db8::/32"]] == await irr.get_routes("AS64500", 6)
+            assert [] == await irr.get_routes("AS64501", 6)
+            assert [
+                ["192.0.2.0/24", "198.51.100.0/24"],
+                ["203.0.113.0/24"],
+                ["192.0.2.0/25", "192.0.2.128/25"],
+            ] == await irr.get_prefixes("AS-TEST")
+            assert [] == await irr.get_prefixes("AS-NONE")
+
+    run(queries())
+    assert "!!" == irrd.queries[0]
+    assert irrd.queries[1].startswith("!nBGPFU-")
+
+
+def test_concurrent(irrd):
+    async def queries():
+        async with AsyncIRRClient(irrd.host, irrd.port) as irr:
+            jobs = [
+                irr.get_prefixes(name, proto)
+                for name in ("AS-TEST", "AS-OTHER", "AS-SUB")
+                for proto in (4, 6)
+            ]
+            return await asyncio.gather(*jobs)
+
+    results = run(queries())
+    assert [["10.0.0.0/8"]] == results[2][1:]
+    assert [["2001:db8::/32"], ["2001:db8:1::/48"]] == results[1]
+    assert results[4] == results[0][1:]
+
+
+def test_query_error(irrd):
+    async def queries():
+        async with AsyncIRRClient(irrd.host, irrd.port) as irr:
+            with pytest.raises(RuntimeError) as excinfo:
+                await irr.query(["!gAS64501", "!x"])
+            assert "unrecognized command" in str(excinfo.value)
+            # connection is still usable
+            return await irr.query(["!gAS64501"])
+
+    assert ["203.0.113.0/24\n"] == run(queries())
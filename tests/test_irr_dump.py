@@ -0,0 +1,72 @@
+import gzip
+import os
+
+import pytest
+
+from bgpfu.irr import DumpIRR
+from bgpfu.irr.dump import iter_rpsl
+
+
+@pytest.fixture
+def dump_file(this_dir):
+    return os.path.join(this_dir, "data", "irr", "test.db")
+
+
+def test_iter_rpsl():
+    lines = [
+        "route: 192.0.2.0/24\n",
+        "origin: AS64500 # comment\n",
+        "\n",
+        "person: Someone\n",
+        "\n",
+        "as-set: AS-TEST\n",
+        "members: AS1\n",
+        " AS2, AS3",
+    ]
+    assert [
+        ("route", {"route": ["192.0.2.0/24"], "origin": ["AS64500"], "source": []}),
+        (
+            "as-set",
+            {"as-set": ["AS-TEST"], "members": ["AS1", "AS2, AS3"], "source": []},
+        ),
+    ] == list(iter_rpsl(lines))
+
+
+def test_dump(dump_file):
+    irr = DumpIRR(dump_file)
+    assert dict(objects=9, routes=5, sets=4) == irr.stats
+
+    assert ["AS64500", "AS-SUB"] == irr.get_sets("AS-TEST", expand=False)
+    # sets from both sources, loop through AS-TEST is harmless
+    assert ["AS64500", "AS64501", "AS64502"] == irr.get_sets("as-test")
+    assert [["192.0.2.0/24", "198.51.100.0/24"]] == irr.get_routes("AS64500")
+    assert [["2001:db8::/32"]] == irr.get_routes("AS64500", 6)
+    assert [] == irr.get_routes("AS64599")
+    assert ["192.0.2.0/24", "2001:db8::/32", "RS-OTHER"] == irr.get_sets(
+        "RS-TEST", expand=False
+    )
+    assert [
+        ["192.0.2.0/24", "198.51.100.0/24"],
+        ["203.0.113.0/24"],
+        ["192.0.2.0/24"],
+    ] == irr.get_prefixes("AS-TEST")
+
+    irr.set_sources("OTHER,TEST")
+    assert ["AS64503"] == irr.get_sets("AS-SUB")
+    irr.set_sources("TEST")
+    assert [["192.0.2.0/24", "198.51.100.0/24"], ["203.0.113.0/24"]] == (
+        irr.get_prefixes("AS-TEST")
+    )
+
+    # names are normalized the same when given to the constructor
+    for sources in (["test"], "other, test"):
+        irr = DumpIRR(dump_file, sources=sources)
+        assert [["192.0.2.0/24", "198.51.100.0/24"]] == irr.get_routes("AS64500")
+
+
+def test_dump_gzip(dump_file, tmpdir):
+    path = str(tmpdir.join("test.db.gz"))
+    with open(dump_file, "rb") as src, gzip.open(path, "wb") as dst:
+        dst.write(src.read())
+
+    assert DumpIRR(dump_file).routes == DumpIRR(path).routes
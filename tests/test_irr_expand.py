@@ -0,0 +1,95 @@
+import pytest
+
+from bgpfu.irr import IRRClient, SetExpander
+from bgpfu.irr.expand import is_set_name
+
+SETS = {
+    "AS-TOP": ["AS1", "AS-A", "AS-B"],
+    "AS-A": ["AS2", "AS-SHARED"],
+    "AS-B": ["AS3", "AS-SHARED", "AS-MISSING"],
+    "AS-SHARED": ["AS4", "AS1", "AS-LOOP"],
+    "AS-LOOP": ["AS5", "AS-A"],
+    "AS-OTHER": ["AS6", "AS-SHARED"],
+}
+
+
+class Fetcher:
+    def __init__(self, sets):
+        self.sets = sets
+        self.calls = []
+
+    def __call__(self, names):
+        self.calls.append(list(names))
+        return [self.sets.get(name) for name in names]
+
+
+def test_is_set_name():
+    assert is_set_name("AS-TEST")
+    assert is_set_name("AS64500:AS-CUSTOMERS")
+    assert is_set_name("RS-TEST")
+    assert not is_set_name("AS64500")
+    assert not is_set_name("as64500")
+    assert not is_set_name("192.0.2.0/24")
+    assert not is_set_name("2001:db8::/32")
+
+
+def test_expand():
+    fetch = Fetcher(SETS)
+    expander = SetExpander(fetch)
+    assert ["AS1", "AS2", "AS4", "AS5", "AS3"] == expander.expand("AS-TOP")
+    # breadth first, one fetch per level
+    assert [
+        ["AS-TOP"],
+        ["AS-A", "AS-B"],
+        ["AS-SHARED", "AS-MISSING"],
+        ["AS-LOOP"],
+    ] == fetch.calls
+    assert 1 == expander.stats["missing"]
+    assert 1 == expander.stats["loops"]
+
+    # known sub-sets are reused
+    assert ["AS6", "AS4", "AS1", "AS5", "AS2"] == expander.expand("AS-OTHER")
+    assert ["AS-OTHER"] == fetch.calls[-1]
+    assert 7 == expander.stats["sets"]
+
+    assert ["AS1", "AS2", "AS4", "AS5", "AS3", "AS6"] == expander.expand(
+        ["AS-TOP", "AS-OTHER"]
+    )
+    assert 5 == len(fetch.calls)
+
+
+def test_expand_limits():
+    with pytest.raises(ValueError, match="depth"):
+        SetExpander(Fetcher(SETS), max_depth=3).expand("AS-TOP")
+    SetExpander(Fetcher(SETS), max_depth=4).expand("AS-TOP")
+
+    with pytest.raises(ValueError, match="size"):
+        SetExpander(Fetcher(SETS), max_size=4).expand("AS-TOP")
+
+
+def test_expand_long_chain():
+    # two levels deep, but each sub-set links to the next one
+    count = 1200
+    sets = {
+        "AS-TOP": ["AS-MID"],
+        "AS-MID": [f"AS-S{i}" for i in range(count)],
+    }
+    for i in range(count):
+        sets[f"AS-S{i}"] = [f"AS{i}", f"AS-S{(i + 1) % count}", "AS-MID"]
+
+    fetch = Fetcher(sets)
+    expander = SetExpander(fetch, max_depth=3)
+    assert [f"AS{i}" for i in range(count)] == expander.expand("AS-TOP")
+    assert count + 1 == expander.stats["loops"]
+    assert 3 == len(fetch.calls)
+    assert count + 2 == expander.stats["sets"]
+
+
+def test_expand_client(irrd):
+    irrd.responses = dict(irrd.responses, **{"!iAS-SUB": "AS64501 AS64502 AS-TEST"})
+    with IRRClient(irrd.host, irrd.port) as irr:
+        assert [["AS64500", "AS-SUB"], None] == irr.get_members(["AS-TEST", "AS-NONE"])
+        assert ["AS64500", "AS64501", "AS64502"] == sorted(
+            irr.get_sets("AS-TEST", client_side=True)
+        )
+    assert "!iAS-TEST,1" not in irrd.queries
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from bgpfu.irr import DumpIRR, IndexIRR
+from bgpfu.irr.index import build_index
+
+
+@pytest.fixture
+def dump_file(this_dir):
+    return os.path.join(this_dir, "data", "irr", "test.db")
+
+
+def test_index(dump_file, tmpdir):
+    path = str(tmpdir.join("test.idx"))
+    assert dict(objects=9, routes=5, sets=4) == build_index([dump_file], path)
+
+    dump = DumpIRR(dump_file)
+    with IndexIRR(path) as irr:
+        for as_set in ("AS-TEST", "AS-SUB", "AS-NONE"):
+            assert sorted(dump.get_sets(as_set)) == sorted(irr.get_sets(as_set))
+            assert dump.get_prefixes(as_set) == irr.get_prefixes(as_set)
+
+        assert [["192.0.2.0/24", "198.51.100.0/24"]] == irr.get_routes("as64500")
+        assert [["2001:db8::/32"]] == irr.get_routes("AS64500", 6)
+        assert [] == irr.get_routes("AS64599")
+        assert [] == irr.get_routes("AS-TEST")
+        assert [None] == irr.get_members(["AS-NONE"])
+        assert ["192.0.2.0/24", "2001:db8::/32", "RS-OTHER"] == irr.get_sets(
+            "RS-TEST", expand=False
+        )
+
+
+def test_index_sources(dump_file, tmpdir):
+    path = str(tmpdir.join("test.idx"))
+    build_index([dump_file], path, sources=["OTHER", "TEST"])
+    with IndexIRR(path) as irr:
+        assert ["AS64503"] == irr.get_sets("AS-SUB")
+        assert [["192.0.2.0/24"]] == irr.get_routes("AS64502")
+
+    build_index([dump_file], path, sources=["TEST"])
+    with IndexIRR(path) as irr:
+        assert [] == irr.get_routes("AS64502")
+
+
+def test_index_invalid(tmpdir):
+    path = tmpdir.join("bad.idx")
+    path.write(b"\0" * 128, mode="wb")
+    with pytest.raises(ValueError):
+        IndexIRR(str(path))
+
+
+def test_index_invalid_origin(tmpdir, caplog):
+    dump = tmpdir.join("bad.db")
+    dump.write(
+        "route: 192.0.2.0/24\norigin: AS4294967296\nsource: TEST\n\n"
+        "route: 198.51.100.0/24\norigin: AS4294967295\nsource: TEST\n"
+    )
+    path = str(tmpdir.join("test.idx"))
+    build_index([str(dump)], path)
+    assert "skipping routes of invalid origin AS4294967296" in caplog.text
+    with IndexIRR(path) as irr:
+        assert [["198.51.100.0/24"]] == irr.get_routes("AS4294967295")
+        assert [] == irr.get_routes("AS4294967296")
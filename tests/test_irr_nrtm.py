@@ -0,0 +1,163 @@
+import os
+import re
+import socketserver
+import threading
+
+import pytest
+
+from bgpfu.irr import DumpIRR, NRTMClient
+from bgpfu.irr.nrtm import iter_nrtm
+
+SERIALS = {
+    11: """ADD 11
+
+route:          192.0.2.128/25
+origin:         AS64500
+source:         TEST
+""",
+    12: """DEL 12
+
+route:          198.51.100.0/24
+origin:         AS64500
+source:         TEST
+""",
+    13: """ADD 13
+
+as-set:         AS-SUB
+members:        AS64501, AS64503
+source:         TEST
+""",
+}
+
+
+class FakeNRTMHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        query = self.rfile.readline().decode("ascii").strip()
+        self.server.queries.append(query)
+        match = re.match(r"-g TEST:3:(\d+)-LAST", query)
+        first = int(match.group(1))
+        oldest = min(self.server.serials)
+        last = max(self.server.serials)
+        if not oldest <= first <= last:
+            self.wfile.write(
+                f"%ERROR:401: invalid range: Not within {oldest}-{last}\n".encode()
+            )
+            return
+
+        out = [f"%START Version: 3 TEST {first}-{last}\n\n"]
+        for serial in range(first, last + 1):
+            out.append(self.server.serials[serial] + "\n")
+        out.append("%END TEST\n")
+        self.wfile.write("".join(out).encode())
+
+
+class FakeNRTM(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, serials):
+        self.serials = serials
+        self.queries = []
+        super().__init__(("127.0.0.1", 0), FakeNRTMHandler)
+
+
+@pytest.fixture
+def nrtmd():
+    server = FakeNRTM(dict(SERIALS))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_iter_nrtm():
+    lines = (
+        "%START Version: 3 TEST 11-12\n\n" + SERIALS[11] + "\n" + SERIALS[12] + "\n"
+    ).splitlines(True)
+    ops = list(iter_nrtm(lines + ["%END TEST\n"]))
+    assert [("ADD", 11), ("DEL", 12)] == [op[:2] for op in ops]
+    assert "route:          192.0.2.128/25\n" == ops[0][2][0]
+
+    # last object closed by %END
+    ops = list(iter_nrtm(lines[:-1] + ["%END TEST\n"]))
+    assert [("ADD", 11), ("DEL", 12)] == [op[:2] for op in ops]
+
+    # truncated, complete objects are yielded before the error
+    it = iter_nrtm(lines[:-2])
+    assert ("ADD", 11) == next(it)[:2]
+    with pytest.raises(RuntimeError):
+        next(it)
+
+    error = "%ERROR:401: invalid range: Not within 11-13\n"
+    assert [] == list(iter_nrtm([error], 14))
+    for first in (None, 5, 13):
+        with pytest.raises(RuntimeError):
+            list(iter_nrtm([error], first))
+    with pytest.raises(RuntimeError):
+        list(iter_nrtm(["%ERROR:401: invalid range\n"], 14))
+    with pytest.raises(RuntimeError):
+        list(iter_nrtm(["%ERROR:403: access denied\n"]))
+
+
+def test_nrtm(this_dir, tmpdir, nrtmd):
+    irr = DumpIRR(os.path.join(this_dir, "data", "irr", "test.db"))
+    irr.set_sources("TEST")
+    serial_file = str(tmpdir.join("TEST.serial"))
+    host, port = nrtmd.server_address
+
+    with pytest.raises(ValueError):
+        NRTMClient(irr, host, port, source="TEST", serial_file=serial_file)
+
+    nrtm = NRTMClient(
+        irr, host, port, source="TEST", serial=10, serial_file=serial_file
+    )
+    assert 3 == nrtm.update()
+    assert ["-g TEST:3:11-LAST"] == nrtmd.queries
+    assert 13 == nrtm.serial
+    assert dict(added=2, deleted=1, updates=1) == nrtm.stats
+    assert [["192.0.2.0/24", "192.0.2.128/25"]] == irr.get_routes("AS64500")
+    assert ["AS64500", "AS64501", "AS64503"] == sorted(irr.get_sets("AS-TEST"))
+
+    # up to date
+    assert 0 == nrtm.update()
+    assert "-g TEST:3:14-LAST" == nrtmd.queries[-1]
+
+    # serial is persisted
+    nrtm = NRTMClient(irr, host, port, source="TEST", serial_file=serial_file)
+    assert 13 == nrtm.serial
+
+    # too old for the server
+    nrtm = NRTMClient(irr, host, port, source="TEST", serial=5)
+    with pytest.raises(RuntimeError) as excinfo:
+        nrtm.update()
+    assert "Not within 11-13" in str(excinfo.value)
+    assert 5 == nrtm.serial
+
+
+def test_nrtm_restart(this_dir, tmpdir, nrtmd, caplog):
+    dump = os.path.join(this_dir, "data", "irr", "test.db")
+    serial_file = str(tmpdir.join("TEST.serial"))
+    host, port = nrtmd.server_address
+
+    irr = DumpIRR(dump)
+    nrtm = NRTMClient(
+        irr, host, port, source="TEST", serial=10, serial_file=serial_file
+    )
+    assert 3 == nrtm.update()
+
+    # restarted from the dump at serial 10, with the serial file at 13
+    irr = DumpIRR(dump)
+    irr.set_sources("TEST")
+    nrtm = NRTMClient(
+        irr, host, port, source="TEST", serial=10, serial_file=serial_file
+    )
+    assert 10 == nrtm.serial
+    assert "TEST.serial is at serial 13, replaying TEST updates from serial 10" in (
+        caplog.text
+    )
+    assert 3 == nrtm.update()
+    assert "-g TEST:3:11-LAST" == nrtmd.queries[-1]
+    assert [["192.0.2.0/24", "192.0.2.128/25"]] == irr.get_routes("AS64500")
+    assert ["AS64500", "AS64501", "AS64503"] == sorted(irr.get_sets("AS-TEST"))
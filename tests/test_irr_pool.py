@@ -0,0 +1,134 @@
+import socket
+import time
+
+import pytest
+
+from bgpfu.cache import DiskCache, MemoryCache
+from bgpfu.irr import CachedIRR, IRRClient, IRRPool, RoutePlanner
+from bgpfu.irr.pool import parse_host
+
+
+def closed_port():
+    sckt = socket.socket()
+    sckt.bind(("127.0.0.1", 0))
+    port = sckt.getsockname()[1]
+    sckt.close()
+    return port
+
+
+def test_parse_host():
+    assert ("rr.ntt.net", 43) == parse_host("rr.ntt.net")
+    assert ("127.0.0.1", 4343) == parse_host("127.0.0.1:4343")
+    assert ("::1", 43) == parse_host("::1")
+    assert ("::1", 4343) == parse_host("[::1]:4343")
+    assert ("::1", 43) == parse_host(("::1", 43))
+
+
+def test_pool_reuse(irrd):
+    with IRRPool([(irrd.host, irrd.port)], size=2) as pool:
+        with pool.connection() as irr:
+            assert isinstance(irr, IRRClient)
+            assert ["AS64500", "AS64501", "AS64502"] == sorted(irr.get_sets("AS-TEST"))
+            first = irr
+
+        with pool.connection() as irr:
+            assert irr is first
+            with pool.connection() as other:
+                assert other is not first
+                assert [["10.0.0.0/8"]] == other.get_routes("AS64503")
+
+    # one keepalive and one !n per connection
+    assert 2 == irrd.queries.count("!!")
+
+
+def test_pool_failover(irrd):
+    with IRRPool([f"127.0.0.1:{closed_port()}", f"{irrd.host}:{irrd.port}"]) as pool:
+        with pool.connection() as irr:
+            assert irrd.port == irr.port
+
+    with pytest.raises(ConnectionError):
+        IRRPool(f"127.0.0.1:{closed_port()}").get()
+
+
+def test_pool_reconnect(irrd):
+    with IRRPool(f"{irrd.host}:{irrd.port}", size=1) as pool:
+        pool.set_sources("RADB")
+        with pool.connection() as irr:
+            first = irr
+
+        # idle connection goes away
+        first.sckt.shutdown(socket.SHUT_WR)
+        time.sleep(0.1)
+        assert not first.is_connected()
+
+        with pool.connection() as irr:
+            assert irr is not first
+            assert [["203.0.113.0/24"]] == irr.get_routes("AS64501")
+
+    assert 2 == irrd.queries.count("!sRADB")
+
+
+def test_planner(irrd):
+    with IRRPool(f"{irrd.host}:{irrd.port}", size=2) as pool:
+        planner = RoutePlanner(pool)
+        prefixes = sum(planner.iter_prefixes(["AS-TEST", "AS-OTHER"]), [])
+        assert 6 == len(prefixes)
+        assert {"10.0.0.0/8", "203.0.113.0/24", "192.0.2.0/24"} < set(prefixes)
+
+        assert 2 == planner.stats["sets"]
+        assert 5 == planner.stats["members"]
+        assert 4 == planner.stats["queries"]
+        assert 1 == planner.stats["queries_saved"]
+
+        # each ASN queried once, split over both connections
+        assert 1 == irrd.queries.count("!gAS64501")
+        assert 2 == irrd.queries.count("!!")
+
+        with pool.connection() as irr:
+            assert sorted(prefixes) == sorted(
+                sum(irr.get_prefixes(["AS-TEST", "AS-OTHER"]), [])
+            )
+
+
+def test_planner_single(irrd):
+    with IRRPool(f"{irrd.host}:{irrd.port}", size=1) as pool:
+        planner = RoutePlanner(pool)
+        assert [] == list(planner.iter_prefixes("AS-NONE"))
+        prefixes = sum(planner.iter_prefixes("AS-TEST", proto=6), [])
+        assert ["2001:db8:1::/48", "2001:db8::/32"] == sorted(prefixes)
+
+
+def test_cached_irr(irrd, tmpdir):
+    with IRRPool(f"{irrd.host}:{irrd.port}") as pool:
+        with DiskCache(str(tmpdir.join("cache.sqlite"))) as cache:
+            irr = CachedIRR(pool, cache)
+            expected = sorted(sum(irr.get_prefixes(["AS-TEST", "AS-OTHER"]), []))
+            assert 6 == len(expected)
+            queries = len(irrd.queries)
+
+            # everything is cached, including empty results
+            pool.close()
+            irr = CachedIRR(pool, cache)
+            assert expected == sorted(
+                sum(irr.get_prefixes(["AS-TEST", "AS-OTHER"]), [])
+            )
+            assert [] == irr.get_routes("AS64599")
+            assert [] == irr.get_routes("AS64599")
+            assert ["AS64501", "AS64503"] == irr.get_sets("AS-OTHER")
+            assert queries + 3 == len(irrd.queries)
+
+            # sources are part of the key
+            irr.set_sources("RADB")
+            assert [["10.0.0.0/8"]] == irr.get_routes("AS64503")
+            assert "!gAS64503" == irrd.queries[-1]
+
+
+def test_cached_irr_memory(irrd):
+    with IRRClient(irrd.host, irrd.port) as client:
+        irr = CachedIRR(client, MemoryCache())
+        for _ in range(3):
+            assert ["AS64500", "AS64501", "AS64502"] == sorted(irr.get_sets("AS-TEST"))
+            assert [["10.0.0.0/8"]] == irr.get_routes("AS64503")
+        assert 1 == irrd.queries.count("!iAS-TEST,1")
+        assert 1 == irrd.queries.count("!gAS64503")
+        assert dict(hits=4, misses=2) == irr.cache.stats
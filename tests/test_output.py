@@ -1,6 +1,9 @@
+import io
+
 import pytest
 
 from bgpfu.output import Output
+from bgpfu.prefixlist import PrefixSet
 
 
 def test_available():
@@ -11,3 +14,14 @@ def test_available():
 def test_load_file():
     output = Output()
     assert output.load_file("templates/juniper.j2")
+
+
+def test_output_txt():
+    output = Output()
+    fobj = io.StringIO()
+    output.write("txt", fobj, ["10.0.0.0/8", "2001:db8::/32"])
+    assert "10.0.0.0/8\n2001:db8::/32\n" == fobj.getvalue()
+
+    fobj = io.StringIO()
+    output.write("txt", fobj, PrefixSet("10.0.0.0/8^9-9").iter_prefixes())
+    assert "10.0.0.0/9\n10.128.0.0/9\n" == fobj.getvalue()
@@ -0,0 +1,89 @@
+import ipaddress
+
+import pytest
+
+from bgpfu.prefixlist import CompactPrefixList, SimplePrefixList
+
+prefixes0 = [
+    "2620::/64",
+    "10.0.0.0/20",
+    "1.0.1.0/24",
+    "20.0.1.0/24",
+    "192.1.0.0/24",
+    "::/0",
+]
+
+
+def test_compact_init():
+    CompactPrefixList()
+
+    pfx = CompactPrefixList(prefixes0)
+
+    assert 4 == len(pfx.ipv4)
+    assert 2 == len(pfx.ipv6)
+    assert 6 == len(pfx)
+    assert prefixes0 == pfx.str_list()
+    assert list(map(ipaddress.ip_network, prefixes0)) == list(pfx)
+
+
+def test_compact_eq():
+    pfx0 = CompactPrefixList(prefixes0)
+    pfx1 = CompactPrefixList(prefixes0)
+    assert pfx0 == pfx1
+    assert pfx0 == SimplePrefixList(prefixes0)
+    assert SimplePrefixList(prefixes0) == pfx0
+
+    pfx1.pop()
+    assert pfx0 != pfx1
+
+    with pytest.raises(TypeError) as excinfo:
+        pfx0 != "string"
+    assert "object not PrefixList type" in str(excinfo.value)
+
+
+def test_compact_sequence():
+    pfx = CompactPrefixList(prefixes0)
+
+    assert ipaddress.ip_network("::/0") == pfx[-1]
+    assert list(map(ipaddress.ip_network, prefixes0[1:3])) == pfx[1:3]
+    with pytest.raises(IndexError):
+        pfx[6]
+
+    pfx[0] = "2001:db8::/32"
+    assert "2001:db8::/32" == str(pfx[0])
+
+    pfx.insert(1, "10.1.0.0/16")
+    assert "10.1.0.0/16" == str(pfx[1])
+    assert 7 == len(pfx)
+
+    del pfx[1]
+    del pfx[:2]
+    assert prefixes0[2:] == pfx.str_list()
+
+    pfx[1:3] = ["10.0.0.0/8"]
+    assert ["1.0.1.0/24", "10.0.0.0/8", "::/0"] == pfx.str_list()
+
+    with pytest.raises(ValueError):
+        pfx.append("10.0.0.1/8")
+
+
+def test_compact_aggregate():
+    prefixlist = [
+        "10.0.1.0/24",
+        "2001:db8::/33",
+        "10.0.0.0/24",
+        "10.0.2.0/23",
+        "2001:db8:8000::/33",
+        "192.0.2.0/24",
+    ]
+    expected = [
+        "10.0.0.0/22",
+        "192.0.2.0/24",
+        "2001:db8::/32",
+    ]
+    pfx = CompactPrefixList(prefixlist)
+
+    aggregate = pfx.aggregate()
+    assert isinstance(aggregate, CompactPrefixList)
+    assert expected == aggregate.str_list()
+    assert SimplePrefixList(prefixlist).aggregate() == aggregate
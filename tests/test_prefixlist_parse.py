@@ -0,0 +1,75 @@
+import ipaddress
+
+import pytest
+
+from bgpfu.prefixlist import SimplePrefixList
+from bgpfu.prefixlist.parse import iter_parse_prefixes, make_network, parse_prefix
+
+valid = [
+    "0.0.0.0/0",
+    "10.0.0.0/8",
+    "192.0.2.0/24",
+    "192.0.2.1/32",
+    "192.0.2.1",
+    "::/0",
+    "2001:db8::/32",
+    "2001:db8::1/128",
+    "::ffff:192.0.2.0/120",
+]
+
+invalid = [
+    "",
+    "/24",
+    "10.0.0.1/8",
+    "10.0.0.0/33",
+    "10.0.0.0/-1",
+    "10.0.0.0/+8",
+    "10.0.0.0/ 8",
+    "10.0.0.0/255.0.0.0",
+    "010.0.0.0/8",
+    "10.0.0/24",
+    "256.0.0.0/8",
+    "2001:db8::1/32",
+    "2001:db8::/129",
+    "2001:g::/32",
+    "2001:db8::/0032",
+    b"junk",
+    b"\x20\x01\x0d\xb8" + bytes(12),
+]
+
+
+@pytest.mark.parametrize("prefix", valid)
+def test_parse_prefix(prefix):
+    expected = ipaddress.ip_network(prefix)
+    net, length, version = parse_prefix(prefix)
+    assert int(expected.network_address) == net
+    assert expected.prefixlen == length
+    assert expected.version == version
+    assert expected == make_network(net, length, version)
+    assert (net, length, version) == parse_prefix(prefix.encode())
+
+
+@pytest.mark.parametrize("prefix", invalid)
+def test_parse_prefix_invalid(prefix):
+    with pytest.raises(ValueError):
+        parse_prefix(prefix)
+
+
+@pytest.mark.parametrize("prefix", [p for p in invalid if isinstance(p, bytes)])
+def test_prefixlist_invalid_bytes(prefix):
+    with pytest.raises(ValueError):
+        SimplePrefixList([prefix])
+
+
+def test_iter_parse_prefixes():
+    payload = "10.0.0.0/8 192.0.2.0/24\n2001:db8::/32\n"
+    expected = [
+        (0x0A000000, 8, 4),
+        (0xC0000200, 24, 4),
+        (0x20010DB8 << 96, 32, 6),
+    ]
+    assert expected == list(iter_parse_prefixes(payload))
+    assert expected == list(iter_parse_prefixes(payload.encode()))
+
+    with pytest.raises(ValueError):
+        list(iter_parse_prefixes("10.0.0.0/8 10.0.0.1/8"))
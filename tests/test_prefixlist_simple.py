@@ -3,6 +3,7 @@ import ipaddress
 import pytest
 
 from bgpfu.prefixlist import SimplePrefixList as PrefixList
+from bgpfu.prefixlist.simple import aggregate_pairs
 
 prefixes0 = [
     "2620::/64",
@@ -183,3 +184,37 @@ def test_aggregate_combine_default():
 
     assert expected == pfx.aggregate().str_list()
     assert PrefixList(prefixlist) == pfx
+
+
+def test_aggregate_pairs():
+    pairs = [
+        (0x0A000100, 24),
+        (0x0A000000, 24),
+        (0x0A000000, 20),
+        (0x0A001000, 21),
+        (0x0A001800, 22),
+        (0x0A001C00, 22),
+        (0x0A001C00, 22),
+    ]
+    assert [(0x0A000000, 19)] == aggregate_pairs(pairs, 32)
+    assert [] == aggregate_pairs([], 32)
+    assert [(0, 0)] == aggregate_pairs([(0, 1), (2 ** 127, 1)], 128)
+
+
+def test_aggregate_mixed():
+    prefixlist = [
+        "10.0.0.0/25",
+        "10.0.0.128/25",
+        "10.0.1.0/24",
+        "10.0.3.0/24",
+        "2001:db8::/33",
+        "2001:db8:8000::/33",
+    ]
+    expected = [
+        "10.0.0.0/23",
+        "10.0.3.0/24",
+        "2001:db8::/32",
+    ]
+    pfx = PrefixList(prefixlist)
+
+    assert expected == pfx.aggregate().str_list()
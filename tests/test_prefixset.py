@@ -157,6 +157,37 @@ def test_prefixset_iter_prefixes():
         assert list(ps.prefixes()) == [ip_network(s)]
 
 
+def test_prefixset_iter_ranges():
+    ps = PrefixSet("2001:db8::/32^32-64") | PrefixSet("10.0.0.0/8^24-24")
+    ranges = list(ps.iter_ranges())
+    assert ranges[0] == (ip_network("10.0.0.0/24"), 2 ** 16)
+    assert ranges[1:] == [
+        (ip_network("2001:db8::/%d" % length), 2 ** (length - 32))
+        for length in range(32, 65)
+    ]
+    assert list(ps.iter_ranges(versions=4)) == ranges[:1]
+
+
+def test_prefixset_iter_prefixes_limit():
+    ps = PrefixSet("2001:db8::/32^32-64")
+    assert list(ps.iter_prefixes(limit=4)) == [
+        ip_network("2001:db8::/32"),
+        ip_network("2001:db8::/33"),
+        ip_network("2001:db8:8000::/33"),
+        ip_network("2001:db8::/34"),
+    ]
+    assert list(ps.iter_prefixes(versions=4)) == []
+
+    chunks = list(PrefixSet("10.0.0.0/8^9-10").iter_prefixes(chunk_size=4))
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    assert chunks[0][:2] == [ip_network("10.0.0.0/9"), ip_network("10.128.0.0/9")]
+
+
+def test_prefixset_str_list():
+    ps = PrefixSet("10.0.0.0/8^9-9")
+    assert ps.str_list() == ["10.0.0.0/9", "10.128.0.0/9"]
+
+
 def test_prefixset_contains_prefix():
     strings = ["10.0.0.0/8", "2001:db8::/32"]
     for s in strings:
@@ -164,6 +195,34 @@ def test_prefixset_contains_prefix():
         assert ip_network(s) in ps
 
 
+def test_prefixset_contains_ranges():
+    ps = PrefixSet({"ipv4": [{"prefix": "10.0.0.0/8", "less-equal": 9}]})
+    ps.iter_add(["192.0.2.0/24", "198.51.100.0/24", "2001:db8::/32"])
+    for s in ["10.0.0.0/8", "10.0.0.0/9", "10.128.0.0/9", "192.0.2.0/24"]:
+        assert s in ps
+    for s in ["10.0.0.0/10", "11.0.0.0/8", "192.0.3.0/24", "2001:db8::/48"]:
+        assert s not in ps
+    assert (6, PrefixSet.index_of("2001:db8::/32")[1]) in ps
+
+
+def test_prefixset_contains_many():
+    ps = PrefixSet("10.0.0.0/8^16-24")
+    ps.iter_add(["2001:db8::/32"])
+    items = [
+        "10.1.0.0/16",
+        "2001:db8::/32",
+        "10.0.0.0/8",
+        ip_network("10.255.255.0/24"),
+        "11.0.0.0/16",
+        "2001:db8::/33",
+        "10.1.0.0/16",
+    ]
+    expected = [True, True, False, True, False, False, True]
+    assert ps.contains_many(items) == expected
+    assert ps.contains_many(items) == [item in ps for item in items]
+    assert ps.contains_many([]) == []
+
+
 def test_prefixset_intersection():
     tuples = [
         ("10.0.0.0/8^16-24", "10.0.0.0/20"),
@@ -183,14 +242,59 @@ def test_prefixset_union():
         assert set((ps1 | ps2).prefixes()) == {ip_network(s1), ip_network(s2)}
 
 
+def test_prefixset_iter_add():
+    ps = PrefixSet()
+    ps.iter_add(["10.0.0.0/24", b"10.0.1.0/24", ip_network("2001:db8::/32")])
+    ps.iter_add(["10.0.0.0/24"])
+    assert len(ps) == 3
+    assert ip_network("10.0.1.0/24") in ps
+    assert ip_network("2001:db8::/32") in ps
+    assert ip_network("10.0.0.0/23") not in ps
+
+
+def test_prefixset_difference():
+    ps1 = PrefixSet("10.0.0.0/8^8-9")
+    ps2 = PrefixSet("10.128.0.0/9")
+    assert set((ps1 - ps2).prefixes()) == {
+        ip_network("10.0.0.0/8"),
+        ip_network("10.0.0.0/9"),
+    }
+    assert len(ps2 - ps1) == 0
+
+
+def test_prefixset_symmetric_difference():
+    ps1 = PrefixSet("10.0.0.0/8^8-9")
+    ps2 = PrefixSet("10.0.0.0/9^9-10")
+    assert set((ps1 ^ ps2).prefixes()) == {
+        ip_network("10.0.0.0/8"),
+        ip_network("10.128.0.0/9"),
+        ip_network("10.0.0.0/10"),
+        ip_network("10.64.0.0/10"),
+    }
+    assert ps1 ^ ps2 == ps2 ^ ps1
+
+
+def test_prefixset_compare():
+    ps1 = PrefixSet("2001:db8::/32^32-64")
+    ps2 = PrefixSet("2001:db8::/48^48-64")
+    assert ps2 <= ps1
+    assert ps2 < ps1
+    assert not ps1 <= ps2
+    assert ps1 >= ps2
+    assert ps1 == (ps1 | ps2)
+    assert ps2 == (ps1 & ps2)
+    assert ps1 != ps2
+    assert not ps1.isdisjoint(ps2)
+    assert ps2.isdisjoint(ps1 - ps2)
+
+
 def test_prefixset_data_no_aggr():
     data = {"ipv4": [{"prefix": "10.0.0.0/8"}], "ipv6": [{"prefix": "2001:db8::/32"}]}
     ps = PrefixSet(data)
     assert ps.data(aggregate=False) == data
 
 
-def no_test_prefixset_data_aggr():
-    """Test broken from py3 conversion."""
+def test_prefixset_data_aggr():
     pre_data = {
         "ipv4": [
             {"prefix": "10.0.0.0/9"},
@@ -210,5 +314,25 @@ def no_test_prefixset_data_aggr():
     assert ps.data(aggregate=True) == post_data
 
 
+def test_prefixset_data_aggr_wide():
+    data = {
+        "ipv4": [
+            {"prefix": "0.0.0.0/0", "less-equal": 32},
+        ],
+        "ipv6": [
+            {"prefix": "2001:db8::/32", "greater-equal": 48, "less-equal": 64},
+            {"prefix": "2001:db9::/32"},
+        ],
+    }
+    ps = PrefixSet(data)
+    assert ps.data(aggregate=True) == data
+
+    ps = ps | PrefixSet("2001:db8::/32^40-47")
+    assert ps.data(aggregate=True)["ipv6"] == [
+        {"prefix": "2001:db8::/32", "greater-equal": 40, "less-equal": 64},
+        {"prefix": "2001:db9::/32"},
+    ]
+
+
 if __name__ == "__main__":
     test_prefixset_data_aggr()
@@ -1,3 +1,9 @@
+import bz2
+import gc
+import gzip
+import io
+import ipaddress
+import json
 import os
 
 import pytest
@@ -88,3 +94,182 @@ def test_roatree_validation(tree):
     state = tree.validation_state(*args)
     assert state["state"] == "invalid"
     assert tree.check_invalid(*args)
+
+
+ROUTES = [
+    ("192.0.2.0/24", 11336),
+    ("2001:db8::/32", 1),
+    ("10.0.4.0/24", 12345),
+    ("192.0.2.0/24", 12345),
+    ("2.0.0.0/24", 63311),
+    ("2001:db8::/32", 63311),
+    ("192.0.2.11/32", 12345),
+    ("10.0.4.0/24", 63311),
+    ("2002:db8::/32", 1),
+    ("invalid", 1),
+]
+
+
+@pytest.mark.parametrize("tree", all_trees())
+def test_roatree_validate_many(tree):
+    routes = ROUTES
+    assert [
+        ("2.0.0.0/24", 63311, "notfound"),
+        ("10.0.4.0/24", 12345, "invalid"),
+        ("10.0.4.0/24", 63311, "valid"),
+        ("192.0.2.0/24", 11336, "invalid"),
+        ("192.0.2.0/24", 12345, "valid"),
+        ("192.0.2.11/32", 12345, "invalid"),
+        ("2001:db8::/32", 1, "valid"),
+        ("2001:db8::/32", 63311, "invalid"),
+        ("2002:db8::/32", 1, "notfound"),
+    ] == list(tree.validate_many(routes))
+
+    states = list(tree.validate_many(routes[6:7], check_maxlength=False))
+    assert [("192.0.2.11/32", 12345, "valid")] == states
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3])
+def test_roatree_validate_parallel(rpki_tree, workers):
+    result = rpki_tree.validate_parallel(ROUTES, workers=workers)
+    assert dict(valid=3, invalid=4, notfound=2) == result["counts"]
+    assert [
+        ("10.0.4.0/24", 12345),
+        ("192.0.2.0/24", 11336),
+        ("192.0.2.11/32", 12345),
+        ("2001:db8::/32", 63311),
+    ] == result["invalid"]
+
+    result = rpki_tree.validate_parallel([], workers=workers)
+    assert dict(valid=0, invalid=0, notfound=0) == result["counts"]
+
+
+def test_roatree_validate_parallel_no_freeze(rpki_tree, monkeypatch):
+    # gc.freeze is new in Python 3.7
+    monkeypatch.delattr(gc, "freeze", raising=False)
+    monkeypatch.delattr(gc, "unfreeze", raising=False)
+    result = rpki_tree.validate_parallel(ROUTES, workers=2)
+    assert dict(valid=3, invalid=4, notfound=2) == result["counts"]
+
+
+def test_roatree_validate_many_rib(this_dir, rpki_tree):
+    rib_file = os.path.join(this_dir, "data", "rib", "test0-v4.txt")
+    assert [
+        ("10.0.4.0/24", 63311, "valid"),
+        ("192.0.2.0/24", 12345, "valid"),
+        ("192.0.2.0/24", 63311, "valid"),
+    ] == list(rpki_tree.validate_many(rib_file))
+
+
+def test_roatree_cache(this_dir):
+    rib_dir = os.path.join(this_dir, "data", "rib")
+    assert RoaTree().cache_stats is None
+
+    tree = RoaTree(rib_file=os.path.join(rib_dir, "test0-v4.txt"), cache_size=2)
+    assert dict(hits=0, misses=0, hit_rate=0.0, size=0) == tree.cache_stats
+
+    state = tree.validation_state("192.0.2.0/24", 12345)
+    assert "valid" == state["state"]
+    assert state is tree.validation_state("192.0.2.0/24", 12345)
+    assert not tree.check_invalid("192.0.2.0/24", 12345)
+    assert tree.check_invalid("192.0.2.0/24", 12345, check_maxlength=False) is False
+    assert dict(hits=2, misses=2, hit_rate=0.5, size=2) == tree.cache_stats
+
+    assert "notfound" == tree.validation_state("2001:db8::/32", 1)["state"]
+    assert 2 == tree.cache_stats["size"]
+
+    # loading clears cached results
+    tree.load_rib_file(os.path.join(rib_dir, "test0-v6.txt"), merge=True)
+    assert 0 == tree.cache_stats["size"]
+    assert "valid" == tree.validation_state("2001:db8::/32", 1)["state"]
+    assert "valid" == tree.validation_state("192.0.2.0/24", 12345)["state"]
+    assert dict(hits=2, misses=5, size=2) == {
+        key: value for key, value in tree.cache_stats.items() if key != "hit_rate"
+    }
+
+    tree.load_rpki_file(os.path.join(this_dir, "data", "rpki", "test0.json"))
+    assert 0 == tree.cache_stats["size"]
+
+
+@pytest.mark.parametrize("compress", [None, "gz", "bz2"])
+def test_roatree_load_rib_compressed(this_dir, tmpdir, compress):
+    with open(os.path.join(this_dir, "data", "rib", "test0-v4.txt"), "rb") as fobj:
+        data = fobj.read() + b"\n192.0.2.1/24 1\n198.51.100.0/24 x|2|-1\n"
+
+    path = str(tmpdir.join("rib.txt"))
+    opener = {None: open, "gz": gzip.open, "bz2": bz2.open}[compress]
+    with opener(path, "wb") as fobj:
+        fobj.write(data)
+
+    tree = RoaTree()
+    tree.load_rib_file(path, batch_size=1)
+    stats = tree.meta["stats"]
+    assert 6 == stats["lines"]
+    assert 4 == stats["roas"]
+    assert "lines_per_sec" in stats
+
+    assert "valid" == tree.validation_state("192.0.2.0/24", 63311)["state"]
+    assert "invalid" == tree.validation_state("10.0.4.0/24", 12345)["state"]
+    assert "valid" == tree.validation_state("198.51.100.0/24", 2)["state"]
+    assert 2 == len(tree.validation_state("192.0.2.0/24", 1)["roas"])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_iter_rpki_json(this_dir, chunk_size):
+    path = os.path.join(this_dir, "data", "rpki", "test0.json")
+    with open(path) as fh:
+        expected = json.load(fh)
+    with open(path) as fh:
+        items = list(bgpfu.roa.iter_rpki_json(fh, chunk_size=chunk_size))
+
+    assert expected["roas"] == [value for key, value in items if key == "roas"]
+    assert [("metadata", expected["metadata"])] == [
+        item for item in items if item[0] != "roas"
+    ]
+
+    data = '{"roas": [], "count": 12345}'
+    assert [("count", 12345)] == list(
+        bgpfu.roa.iter_rpki_json(io.StringIO(data), chunk_size=1)
+    )
+    with pytest.raises(ValueError):
+        list(
+            bgpfu.roa.iter_rpki_json(io.StringIO('{"roas": [{"asn": 1}'), chunk_size=4)
+        )
+
+
+def test_roatree_load_rpki_csv(tmpdir):
+    path = tmpdir.join("vrps.csv")
+    path.write(
+        "ASN,IP Prefix,Max Length,Trust Anchor\n"
+        "AS12345,192.0.2.0/24,24,apnic\n"
+        "AS63311,192.0.0.0/20,24,apnic\n"
+        "AS63311,10.0.4.0/24,24,apnic\n"
+        "AS1,2001:db8::/32,48,ripe\n"
+        "AS1,2001:db8:1::/32,48,ripe\n"
+        "AS65000,198.51.100.0/24,300,x\n"
+        "AS65000,198.51.100.0/24,23,x\n"
+    )
+    tree = RoaTree(rpki_file=str(path))
+    assert 4 == tree.meta["stats"]["roas"]
+    assert "notfound" == tree.validation_state("198.51.100.0/24", 65001)["state"]
+    assert "rpki" == tree.meta["type"]
+
+    state = tree.validation_state("192.0.2.0/24", 63311)
+    assert "valid" == state["state"]
+    assert (
+        dict(asn=63311, prefix=ipaddress.ip_network("192.0.0.0/20"), maxLength=24)
+        == state["roa"]
+    )
+    assert "invalid" == tree.validation_state("10.0.4.0/24", 12345)["state"]
+    assert "valid" == tree.validation_state("2001:db8::/48", 1)["state"]
+
+
+def test_roatree_rpki_meta(rpki_tree):
+    assert 36929 == rpki_tree.meta["roas"]
+    assert 5 == rpki_tree.meta["stats"]["roas"]
+
+    state = rpki_tree.validation_state("10.0.4.0/24", 12345)
+    assert "invalid" == state["state"]
+    assert [
+        dict(asn=63311, prefix=ipaddress.ip_network("10.0.4.0/24"), maxLength=24)
+    ] == state["roas"]
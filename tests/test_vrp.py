@@ -0,0 +1,173 @@
+import ipaddress
+import random
+
+import pytest
+
+from bgpfu.prefixlist.parse import parse_prefix
+from bgpfu.roa import RoaTree, parse_vrp
+from bgpfu.vrp import VRPStore, pack_vrp, unpack_vrp
+
+
+def test_pack_vrp():
+    assert (4294967295, 128) == unpack_vrp(pack_vrp(4294967295, 128))
+    assert (0, 0) == unpack_vrp(pack_vrp(0, 0))
+    for asn, max_length in ((65000, 300), (65000, -1), (-1, 24)):
+        with pytest.raises(ValueError):
+            pack_vrp(asn, max_length)
+
+
+def test_parse_vrp():
+    assert ((3221225984, 24, 4), (65000, 24)) == parse_vrp(
+        "192.0.2.0/24", "AS65000", 24
+    )
+    assert 128 == parse_vrp("2001:db8::/32", 1, "128")[1][1]
+    for max_length in (23, 33, 300, -1):
+        with pytest.raises(ValueError):
+            parse_vrp("192.0.2.0/24", "AS65000", max_length)
+    with pytest.raises(ValueError):
+        parse_vrp("2001:db8::/32", 1, 129)
+
+
+@pytest.mark.parametrize("probe_lengths", [0, 4])
+def test_vrp_store(monkeypatch, probe_lengths):
+    monkeypatch.setattr(VRPStore, "PROBE_LENGTHS", probe_lengths)
+    store = VRPStore()
+    store.add(*parse_prefix("192.0.0.0/20"), [(63311, 24)])
+    store.add(*parse_prefix("192.0.2.0/24"), [(12345, 24)])
+    store.add(*parse_prefix("192.0.2.0/24"), [(63311, 24), (1, 32)])
+    store.add(*parse_prefix("2001:db8::/32"), [(1, 48)])
+    store.add(*parse_prefix("10.0.0.0/8"), [])
+    assert 3 == len(store)
+
+    assert [(12345, 24), (63311, 24), (1, 32)] == store.get(
+        *parse_prefix("192.0.2.0/24")
+    )
+    assert [] == store.get(*parse_prefix("192.0.3.0/24"))
+
+    net = int(ipaddress.ip_address("192.0.0.0"))
+    assert [(net, 20, [(63311, 24)]), (net + 512, 24, store.get(net + 512, 24, 4))] == (
+        list(store.iter_covering(*parse_prefix("192.0.2.128/25")))
+    )
+    assert [(net, 20, [(63311, 24)])] == list(
+        store.iter_covering(*parse_prefix("192.0.4.0/24"))
+    )
+    assert [] == list(store.iter_covering(*parse_prefix("192.0.0.0/16")))
+    assert 1 == len(list(store.iter_covering(*parse_prefix("2001:db8:1::/48"))))
+    assert [] == list(store.iter_covering(*parse_prefix("2002::/16")))
+
+    assert (net + 512, 24, store.get(net + 512, 24, 4)) == store.best_covering(
+        *parse_prefix("192.0.2.128/25")
+    )
+    assert (net, 20, [(63311, 24)]) == store.best_covering(
+        *parse_prefix("192.0.4.0/24")
+    )
+    assert store.best_covering(*parse_prefix("192.0.0.0/16")) is None
+
+    # adding after lookups updates the index
+    store.add(*parse_prefix("192.0.2.0/23"), [(2, 24)])
+    assert [20, 23, 24] == [
+        length for _, length, _ in store.iter_covering(*parse_prefix("192.0.2.128/25"))
+    ]
+    store.add(*parse_prefix("192.0.2.0/23"), [(3, 24)])
+    assert [(2, 24), (3, 24)] == store.best_covering(*parse_prefix("192.0.3.0/24"))[2]
+
+
+def brute_force_state(vrps, prefix, origin):
+    """reference validation over a plain list of (prefix, asn, maxLength)"""
+    covering = [vrp for vrp in vrps if prefix.subnet_of(vrp[0])]
+    if not covering:
+        return "notfound"
+    for vrp_prefix, asn, max_length in covering:
+        if asn == origin and prefix.prefixlen <= max_length:
+            return "valid"
+    return "invalid"
+
+
+def brute_force_best(vrps, prefix, origin):
+    """reference validate_best over a plain list of (prefix, asn, maxLength)"""
+    covering = [vrp for vrp in vrps if prefix.subnet_of(vrp[0])]
+    if not covering:
+        return "notfound"
+    best = max(vrp_prefix.prefixlen for vrp_prefix, _, _ in covering)
+    for vrp_prefix, asn, _ in covering:
+        if vrp_prefix.prefixlen == best and asn == origin:
+            return "valid"
+    return "invalid"
+
+
+@pytest.mark.parametrize("skip,probe_lengths", [(1, 0), (8, 32), (1 << 30, 0)])
+def test_validation_random(tmpdir, monkeypatch, skip, probe_lengths):
+    monkeypatch.setattr(VRPStore, "SKIP", skip)
+    monkeypatch.setattr(VRPStore, "PROBE_LENGTHS", probe_lengths)
+    rnd = random.Random(0)
+    vrps = []
+    for _ in range(300):
+        # all within 10.0.0.0/8 so they overlap
+        length = rnd.randint(8, 24)
+        net = 10 << 24 | rnd.getrandbits(length - 8) << (32 - length)
+        prefix = ipaddress.ip_network((net, length))
+        vrps.append((prefix, rnd.randint(1, 5), rnd.randint(length, 24)))
+
+    path = tmpdir.join("vrps.csv")
+    path.write(
+        "".join(f"AS{asn},{prefix},{max_len},x\n" for prefix, asn, max_len in vrps)
+    )
+    tree = RoaTree(rpki_file=str(path))
+
+    routes = []
+    for _ in range(2000):
+        prefix, _, _ = rnd.choice(vrps)
+        length = rnd.randint(prefix.prefixlen, 28)
+        net = int(prefix.network_address) | rnd.getrandbits(32 - prefix.prefixlen)
+        query = ipaddress.ip_network((net >> (32 - length) << (32 - length), length))
+        routes.append((query, rnd.randint(1, 5)))
+    # and some outside any vrp
+    routes += [(ipaddress.ip_network(f"11.{i}.0.0/16"), 1) for i in range(10)]
+
+    expected = {}
+    for query, origin in routes:
+        state = brute_force_state(vrps, query, origin)
+        assert state == tree.validation_state(query, origin)["state"]
+        assert brute_force_best(vrps, query, origin) == (
+            tree.validate_best(query, origin)["state"]
+        )
+        expected[(query, origin)] = state
+
+    results = list(tree.validate_many(routes))
+    assert len(routes) == len(results)
+    prefixes = [query for query, _, _ in results]
+    assert sorted(prefixes) == prefixes
+    assert expected == {(query, origin): state for query, origin, state in results}
+
+    result = tree.validate_parallel(routes, workers=2)
+    assert [
+        (query, origin) for query, origin, state in results if state == "invalid"
+    ] == (result["invalid"])
+    assert len(routes) == sum(result["counts"].values())
+
+
+@pytest.mark.parametrize("skip", [1, 8, 1 << 30])
+def test_iter_covering_sorted(monkeypatch, skip):
+    monkeypatch.setattr(VRPStore, "SKIP", skip)
+    rnd = random.Random(1)
+    store = VRPStore()
+    for _ in range(200):
+        length = rnd.randint(8, 24)
+        net = 10 << 24 | rnd.getrandbits(length - 8) << (32 - length)
+        store.add(net, length, 4, [(rnd.randint(1, 3), rnd.randint(length, 24))])
+
+    prefixes = [
+        (10 << 24 | rnd.getrandbits(16) << 8, rnd.randint(8, 24)) for _ in range(500)
+    ]
+    prefixes = [
+        (net >> (32 - length) << (32 - length), length) for net, length in prefixes
+    ]
+    prefixes.sort()
+    for (net, length), chain in zip(prefixes, store.iter_covering_sorted(prefixes, 4)):
+        expected = []
+        for cover_net, cover_len, vrps in store.iter_covering(net, length, 4):
+            asns = {}
+            for asn, max_length in vrps:
+                asns[asn] = max(max_length, asns.get(asn, -1))
+            expected.append((cover_net, cover_len, asns))
+        assert expected == chain